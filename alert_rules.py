@@ -0,0 +1,376 @@
+"""
+Threshold alert evaluation over the sensor_data stream.
+
+A declarative rule set (dicts, or a JSON list of them) is compiled into
+one sorted threshold index per (column, comparison). Evaluating a batch of
+readings is then one np.searchsorted per index, however many rules it
+holds, followed by array-level deduplication and per-batch_id rate
+limiting. Fired alerts convert to rows of the public.alerts table that the
+Alerts page reads.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+import generate_dataset as gd
+import instrumentation
+import shelf_life_model as slm
+
+SEVERITIES = ['info', 'warning', 'critical']
+OPERATORS = ['>', '>=', '<', '<=']
+
+DEFAULT_COOLDOWN_SECONDS = 15 * 60
+
+# The risk factors of ml_prediction/index.ts and the Quality_Label cutoffs
+# of generate_dataset, as rules
+DEFAULT_RULES = [
+    {'id': 'high_temperature', 'column': 'temperature', 'op': '>',
+     'threshold': slm.RISK_TEMPERATURE_C, 'severity': 'critical',
+     'alert_type': 'Threshold Violation', 'message': 'High Temperature'},
+    {'id': 'high_acidity', 'column': 'ph', 'op': '<',
+     'threshold': slm.RISK_PH, 'severity': 'warning',
+     'alert_type': 'Quality Risk', 'message': 'High Acidity'},
+    {'id': 'bacterial_contamination', 'column': 'bacteria_count', 'op': '>',
+     'threshold': slm.RISK_BACTERIA_CFU, 'severity': 'critical',
+     'alert_type': 'Quality Risk', 'message': 'Bacterial Contamination'},
+    {'id': 'low_quality', 'column': 'shelf_life_hours', 'op': '<=',
+     'threshold': gd.MEDIUM_QUALITY_HOURS, 'severity': 'critical',
+     'alert_type': 'Quality Risk', 'message': 'Shelf life within Low quality range'},
+    {'id': 'medium_quality', 'column': 'shelf_life_hours', 'op': '<=',
+     'threshold': gd.HIGH_QUALITY_HOURS, 'severity': 'warning',
+     'alert_type': 'Quality Risk', 'message': 'Shelf life below High quality range'},
+]
+
+
+def _derive_shelf_life(readings):
+    return gd.shelf_life_hours(readings['temperature'], readings['ph'],
+                               readings['bacteria_count'])
+
+
+# column -> (columns it needs, function of the readings); computed only when
+# an active rule refers to the column and the readings do not carry it
+DERIVED_COLUMNS = {
+    'shelf_life_hours': (('temperature', 'ph', 'bacteria_count'), _derive_shelf_life),
+}
+
+
+def load_rules(path):
+    """
+    Reads a JSON list of rule dicts.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def normalize_rule(rule, index=0):
+    """
+    Checks one rule dict and fills in the optional keys.
+    """
+    missing = {'column', 'op', 'threshold'} - set(rule)
+    if missing:
+        raise ValueError(f"Rule {index} is missing {', '.join(sorted(missing))}")
+    if rule['op'] not in OPERATORS:
+        raise ValueError(f"Rule {index} has unknown op {rule['op']!r}; use one of {OPERATORS}")
+    severity = rule.get('severity', 'warning')
+    if severity not in SEVERITIES:
+        raise ValueError(f"Rule {index} has unknown severity {severity!r}")
+    rule_id = rule.get('id', f"rule_{index}")
+    return {
+        'id': rule_id,
+        'column': rule['column'],
+        'op': rule['op'],
+        'threshold': float(rule['threshold']),
+        'severity': severity,
+        'alert_type': rule.get('alert_type', 'Threshold Violation'),
+        'message': rule.get('message', f"{rule['column']} {rule['op']} {rule['threshold']}"),
+        'cooldown_seconds': rule.get('cooldown_seconds'),
+    }
+
+
+def compile_rules(rules):
+    """
+    Groups rules into threshold indexes, one per (column, op).
+
+    '<' and '<=' are indexed on negated values so every index answers the
+    same question: which thresholds lie below the value. Returns a list of
+    (column, sign, side, sorted_thresholds, rule_indexes); the rules a
+    value fires are rule_indexes[:searchsorted(sorted_thresholds, sign *
+    value, side)].
+    """
+    groups = {}
+    for i, rule in enumerate(rules):
+        groups.setdefault((rule['column'], rule['op']), []).append(i)
+    compiled = []
+    for (column, op), members in groups.items():
+        sign = 1.0 if op in ('>', '>=') else -1.0
+        # Strict comparisons must not count a threshold equal to the value
+        side = 'left' if op in ('>', '<') else 'right'
+        members = np.asarray(members, dtype=np.int64)
+        keys = sign * np.array([rules[i]['threshold'] for i in members])
+        order = np.argsort(keys, kind='stable')
+        compiled.append((column, sign, side, keys[order], members[order]))
+    return compiled
+
+
+def _timestamps_ms(readings, n, clock):
+    timestamps = readings.get('timestamp') if hasattr(readings, 'get') else None
+    if timestamps is None:
+        return np.full(n, clock() * 1000.0)
+    timestamps = np.asarray(timestamps)
+    if timestamps.dtype.kind == 'M':
+        return timestamps.astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+    return timestamps.astype(np.float64) * 1000.0  # epoch seconds
+
+
+class AlertEngine:
+    """
+    Evaluates a compiled rule set against batches of readings.
+
+    evaluate() takes a dict (or DataFrame) of sensor_data columns, fires
+    every matching (reading, rule) pair, keeps the first pair per batch_id
+    and rule, and drops those still inside the rule's cooldown since that
+    batch's last alert for it. Rule columns that the readings do not carry
+    and cannot derive (DERIVED_COLUMNS) are skipped for that call.
+
+    Last-alert times live in a (batch, rule) array; forget() releases the
+    rows of retired batches for reuse.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, cooldown_seconds=DEFAULT_COOLDOWN_SECONDS,
+                 clock=time.time):
+        self.rules = [normalize_rule(rule, i) for i, rule in enumerate(rules)]
+        self.clock = clock
+        self._index = compile_rules(self.rules)
+        self.rule_ids = np.array([r['id'] for r in self.rules], dtype=object)
+        self.thresholds = np.array([r['threshold'] for r in self.rules])
+        self.severity_codes = np.array([SEVERITIES.index(r['severity']) for r in self.rules],
+                                       dtype=np.int8)
+        self.cooldown_ms = np.array([
+            (cooldown_seconds if r['cooldown_seconds'] is None else r['cooldown_seconds']) * 1000.0
+            for r in self.rules])
+        self._codes = {}
+        self._free_codes = []
+        self._last_alert_ms = np.full((1024, len(self.rules)), -np.inf)
+        self.readings = 0
+        self.fired = 0
+        self.duplicates = 0
+        self.rate_limited = 0
+        self.alerts = 0
+        self.evaluations = 0
+        self.total_latency_s = 0.0
+        self.max_latency_s = 0.0
+        self.last_latency_s = 0.0
+
+    def stats(self):
+        return {
+            'rules': len(self.rules),
+            'indexes': len(self._index),
+            'tracked_batches': len(self._codes),
+            'readings': self.readings,
+            'fired': self.fired,
+            'duplicates': self.duplicates,
+            'rate_limited': self.rate_limited,
+            'alerts': self.alerts,
+            'last_latency_ms': self.last_latency_s * 1000,
+            'mean_latency_ms': (self.total_latency_s / self.evaluations * 1000
+                                if self.evaluations else 0.0),
+            'max_latency_ms': self.max_latency_s * 1000,
+        }
+
+    def _batch_codes(self, batch_ids):
+        unique_ids, inverse = np.unique(batch_ids, return_inverse=True)
+        codes = np.empty(len(unique_ids), dtype=np.int64)
+        for i, batch_id in enumerate(unique_ids.tolist()):
+            code = self._codes.get(batch_id)
+            if code is None:
+                code = self._free_codes.pop() if self._free_codes else len(self._codes)
+                self._codes[batch_id] = code
+            codes[i] = code
+        capacity = len(self._last_alert_ms)
+        needed = int(codes.max()) + 1 if len(codes) else 0
+        if needed > capacity:
+            grown = np.full((max(needed, 2 * capacity), len(self.rules)), -np.inf)
+            grown[:capacity] = self._last_alert_ms
+            self._last_alert_ms = grown
+        return codes[inverse]
+
+    def forget(self, batch_ids):
+        """
+        Drops the rate-limit state of retired batches.
+        """
+        for batch_id in batch_ids:
+            code = self._codes.pop(batch_id, None)
+            if code is not None:
+                self._last_alert_ms[code] = -np.inf
+                self._free_codes.append(code)
+
+    def fire(self, readings):
+        """
+        Every (row, rule) pair whose condition holds, before deduplication
+        and rate limiting: (rows, rules, values) arrays, values being the
+        reading each rule compared.
+        """
+        rows, rules, fired_values = [], [], []
+        derived = {}
+        for column, sign, side, keys, members in self._index:
+            if column in readings:
+                values = readings[column]
+            elif column in derived:
+                values = derived[column]
+            elif column in DERIVED_COLUMNS and all(c in readings
+                                                   for c in DERIVED_COLUMNS[column][0]):
+                values = derived[column] = DERIVED_COLUMNS[column][1](readings)
+            else:
+                continue
+            values = np.asarray(values, dtype=np.float64)
+            counts = np.searchsorted(keys, sign * values, side=side)
+            counts[np.isnan(values)] = 0
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # Expand counts into (row, k-th lowest threshold) pairs
+            fired_rows = np.repeat(np.arange(len(values)), counts)
+            starts = np.cumsum(counts) - counts
+            rank = np.arange(total) - np.repeat(starts, counts)
+            rows.append(fired_rows)
+            rules.append(members[rank])
+            fired_values.append(values[fired_rows])
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(rows), np.concatenate(rules), np.concatenate(fired_values)
+
+    def evaluate(self, readings):
+        """
+        Alerts raised by one batch of readings, as a dict of arrays ordered
+        by row: row, batch_id, rule, value, timestamp_ms and occurrences
+        (how many readings in the batch fired the same batch_id and rule).
+        """
+        start = time.perf_counter()
+        batch_ids = np.asarray(readings['batch_id'])
+        n = len(batch_ids)
+        rows, rules, values = self.fire(readings)
+        self.fired += len(rows)
+
+        if len(rows):
+            # Map each firing reading's batch_id once, not once per fired rule
+            fired_rows, row_slot = np.unique(rows, return_inverse=True)
+            codes = self._batch_codes(batch_ids[fired_rows])[row_slot]
+            pair = codes * len(self.rules) + rules
+            # A rule's pairs come from one index in row order, so a stable
+            # sort on the pair alone leaves each pair's earliest row first
+            order = np.argsort(pair, kind='stable')
+            pair = pair[order]
+            first = np.ones(len(pair), dtype=bool)
+            first[1:] = pair[1:] != pair[:-1]
+            starts = np.flatnonzero(first)
+            occurrences = np.diff(np.append(starts, len(pair)))
+            keep = order[starts]
+            self.duplicates += len(rows) - len(keep)
+            rows, rules, values, codes = rows[keep], rules[keep], values[keep], codes[keep]
+
+            timestamp_ms = _timestamps_ms(readings, n, self.clock)[rows]
+            last = self._last_alert_ms[codes, rules]
+            allowed = timestamp_ms - last >= self.cooldown_ms[rules]
+            self.rate_limited += int(np.count_nonzero(~allowed))
+            rows, rules, values, codes = (rows[allowed], rules[allowed], values[allowed],
+                                          codes[allowed])
+            timestamp_ms, occurrences = timestamp_ms[allowed], occurrences[allowed]
+            self._last_alert_ms[codes, rules] = timestamp_ms
+
+            by_row = np.argsort(rows, kind='stable')
+            rows, rules, values = rows[by_row], rules[by_row], values[by_row]
+            timestamp_ms, occurrences = timestamp_ms[by_row], occurrences[by_row]
+        else:
+            timestamp_ms = np.empty(0)
+            occurrences = np.empty(0, dtype=np.int64)
+
+        alerts = {
+            'row': rows,
+            'batch_id': batch_ids[rows],
+            'rule': rules,
+            'value': values,
+            'timestamp_ms': timestamp_ms,
+            'occurrences': occurrences,
+        }
+        self.alerts += len(rows)
+        self.readings += n
+        instrumentation.count('alerts_raised', len(rows))
+        self.evaluations += 1
+        elapsed = time.perf_counter() - start
+        self.last_latency_s = elapsed
+        self.total_latency_s += elapsed
+        self.max_latency_s = max(self.max_latency_s, elapsed)
+        if instrumentation.enabled():
+            instrumentation.record_time('AlertEngine.evaluate', elapsed, n)
+        return alerts
+
+    def alert_rows(self, alerts):
+        """
+        Converts evaluate() output into public.alerts rows; sensor_id
+        carries the batch_id.
+        """
+        triggered = np.datetime_as_string(alerts['timestamp_ms'].astype('datetime64[ms]'),
+                                          unit='ms', timezone='UTC')
+        return [{
+            'severity': self.rules[rule]['severity'],
+            'message': f"{self.rules[rule]['message']} for batch {batch_id}",
+            'alert_type': self.rules[rule]['alert_type'],
+            'sensor_id': str(batch_id),
+            'threshold_value': self.rules[rule]['threshold'],
+            'actual_value': round(float(value), 3),
+            'status': 'active',
+            'triggered_at': str(ts),
+        } for rule, batch_id, value, ts in zip(alerts['rule'].tolist(), alerts['batch_id'],
+                                                alerts['value'].tolist(), triggered)]
+
+
+def random_rules(num_rules, rng=None):
+    """
+    num_rules rules with thresholds spread over the simulator's reading
+    ranges, for load testing.
+    """
+    rng = np.random.default_rng(rng)
+    ranges = {'temperature': (4.5, 15.0), 'ph': (6.3, 6.7), 'humidity': (60.0, 95.0),
+              'bacterial_risk': (0.1, 0.9)}
+    columns = list(ranges)
+    rules = []
+    for i in range(num_rules):
+        column = columns[i % len(columns)]
+        low, high = ranges[column]
+        rules.append({'id': f"{column}_{i}", 'column': column,
+                      'op': '<' if column == 'ph' else '>',
+                      'threshold': round(float(rng.uniform(low, high)), 3),
+                      'severity': SEVERITIES[int(rng.integers(1, 3))]})
+    return rules
+
+
+def main(argv=None):
+    import sensor_simulator
+
+    parser = argparse.ArgumentParser(description="Evaluate alert rules over simulated readings.")
+    parser.add_argument('--batches', type=int, default=20_000, help="concurrent batches")
+    parser.add_argument('--rules', type=int, default=300, help="random rules to load")
+    parser.add_argument('--rules-file', help="JSON list of rules instead of random ones")
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rules = load_rules(args.rules_file) if args.rules_file else random_rules(args.rules, args.seed)
+    engine = AlertEngine(rules)
+    simulator = sensor_simulator.SensorSimulator(args.batches, excursion_rate_per_hour=0.2,
+                                                 rng=args.seed)
+    for _ in range(args.ticks):
+        engine.evaluate(simulator.tick())
+    stats = engine.stats()
+    print(f"{stats['readings']:,} readings x {stats['rules']} rules ({stats['indexes']} indexes): "
+          f"{stats['fired']:,} fired, {stats['duplicates']:,} duplicates, "
+          f"{stats['rate_limited']:,} rate limited, {stats['alerts']:,} alerts")
+    print(f"latency per {args.batches:,}-reading batch: mean {stats['mean_latency_ms']:.1f} ms, "
+          f"max {stats['max_latency_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Write/read time and file size of every dataset output format against CSV.
+
+Usage: python benchmarks/bench_formats.py [num_rows]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_dataset as gd  # noqa: E402
+
+CASES = [
+    ('csv', 'dataset.csv', {}),
+    ('parquet', 'dataset.parquet', {'compression': 'snappy'}),
+    ('parquet', 'dataset_zstd.parquet', {'compression': 'zstd'}),
+    ('feather', 'dataset.feather', {}),
+    ('feather', 'dataset_lz4.feather', {'compression': 'lz4'}),
+    ('npy', 'dataset_npy', {}),
+]
+
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def run(num_rows=1_000_000, seed=0):
+    results = []
+    workdir = tempfile.mkdtemp(prefix='dairyguard-bench-')
+    try:
+        for fmt, name, options in CASES:
+            path = os.path.join(workdir, name)
+
+            start = time.perf_counter()
+            gd.write_milk_dataset(path, num_rows, rng=seed, fmt=fmt, **options)
+            write_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            gd.load_dataset(path, fmt=fmt)
+            read_s = time.perf_counter() - start
+
+            # Numeric columns only, the way model training consumes them
+            start = time.perf_counter()
+            columns = gd.load_columns(path, fmt=fmt, columns=gd.NUMERIC_COLUMNS)
+            sum(float(columns[c].sum()) for c in gd.NUMERIC_COLUMNS)
+            numeric_s = time.perf_counter() - start
+
+            results.append({
+                'format': name,
+                'write_s': write_s,
+                'read_s': read_s,
+                'numeric_read_s': numeric_s,
+                'size_mb': _size(path) / 1e6,
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Benchmarking dataset formats with {rows:,} rows...")
+    print(f"{'format':<22}{'write s':>10}{'read s':>10}{'numeric s':>11}{'size MB':>10}")
+    for r in run(rows):
+        print(f"{r['format']:<22}{r['write_s']:>10.3f}{r['read_s']:>10.3f}"
+              f"{r['numeric_read_s']:>11.3f}{r['size_mb']:>10.1f}")
@@ -0,0 +1,291 @@
+"""
+Benchmark harness for the dataset generation, I/O, scoring and SPC hot paths.
+
+Every case runs in a fresh process and reports the wall time and peak RSS
+growth of its timed section only, so imports and input setup are left out
+of both. Results are written to a JSON file and compared against a stored
+baseline; a case whose wall time exceeds the baseline by more than
+--tolerance is reported as a regression, and a case whose process crashes
+or times out as a failure. Either makes the script exit non-zero.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--output results.json]
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_DIR = os.path.join(ROOT, 'benchmarks')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results.json')
+DEFAULT_TOLERANCE = 0.25
+# Slowdowns smaller than this are timer noise on the millisecond cases
+DEFAULT_MIN_DELTA_S = 0.02
+# Seconds to wait for one run of a case before reporting it as failed
+DEFAULT_TIMEOUT_S = 900
+SEED = 0
+
+
+class CaseFailed(RuntimeError):
+    pass
+
+
+def _rss_kb(field):
+    # Current (VmRSS) or peak (VmHWM) resident set size from /proc, in kB
+    with open('/proc/self/status') as f:
+        return int(re.search(rf'^{field}:\s+(\d+)', f.read(), re.MULTILINE).group(1))
+
+
+class _Timed:
+    """
+    Wall time and peak RSS growth of a case's hot path.
+
+    On Linux the peak RSS counter is reset on entry (/proc/self/clear_refs),
+    so allocations made and freed during setup do not count. Elsewhere
+    ru_maxrss cannot be reset and the figure is an upper bound.
+    """
+
+    def __enter__(self):
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            self._peak_kb = lambda: _rss_kb('VmHWM')
+            self._rss_start_kb = _rss_kb('VmRSS')
+        except OSError:
+            self._peak_kb = lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self._rss_start_kb = 0
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_s = time.perf_counter() - self._start
+        self.peak_rss_mb = (self._peak_kb() - self._rss_start_kb) / 1024
+
+
+def _generate(rows):
+    import generate_dataset as gd
+    gd.DATASET_DTYPES  # built lazily on first access; keep that out of the timing
+    with _Timed() as timed:
+        gd.generate_milk_dataset(rows, rng=SEED)
+    return rows, timed
+
+
+def _write_read(fmt, rows):
+    import generate_dataset as gd
+    gd.DATASET_DTYPES  # imports pandas; keep that out of the timing
+    if fmt != 'csv':
+        import pyarrow  # noqa: F401
+    workdir = tempfile.mkdtemp(prefix='dairyguard-bench-')
+    try:
+        path = os.path.join(workdir, {'npy': 'dataset'}.get(fmt, f'dataset.{fmt}'))
+        with _Timed() as timed:
+            gd.write_milk_dataset(path, rows, rng=SEED, fmt=fmt)
+            gd.load_dataset(path, fmt=fmt)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows, timed
+
+
+def _score(rows):
+    import shelf_life_model as slm
+    columns = _inputs(rows)
+    with _Timed() as timed:
+        slm.score_batches(columns, base_hours=slm.BASE_HOURS)
+    return rows, timed
+
+
+def _xbar_r(rows):
+    import spc
+    ph = _inputs(rows)['pH']
+    with _Timed() as timed:
+        spc.xbar_r_chart(ph, 5)
+    return rows, timed
+
+
+def _p_chart(rows):
+    import generate_dataset as gd
+    import spc
+    defective = _inputs(rows)['Quality_Label'] == gd.QUALITY_LABELS.index('Low')
+    with _Timed() as timed:
+        spc.p_chart_from_flags(defective, 100)
+    return rows, timed
+
+
+def _inputs(rows):
+    import generate_dataset as gd
+    return gd.generate_milk_columns(rows, rng=SEED)
+
+
+# name -> (function returning (rows, _Timed), args, included in --quick)
+CASES = {
+    'generate_1k': (_generate, (1_000,), True),
+    'generate_100k': (_generate, (100_000,), True),
+    'generate_10m': (_generate, (10_000_000,), False),
+    'io_csv_1m': (_write_read, ('csv', 1_000_000), False),
+    'io_parquet_1m': (_write_read, ('parquet', 1_000_000), False),
+    'io_feather_1m': (_write_read, ('feather', 1_000_000), False),
+    'io_npy_1m': (_write_read, ('npy', 1_000_000), False),
+    'io_csv_100k': (_write_read, ('csv', 100_000), True),
+    'io_npy_100k': (_write_read, ('npy', 100_000), True),
+    'score_1m': (_score, (1_000_000,), True),
+    'xbar_r_10m': (_xbar_r, (10_000_000,), False),
+    'p_chart_10m': (_p_chart, (10_000_000,), False),
+    'xbar_r_1m': (_xbar_r, (1_000_000,), True),
+}
+
+
+def _run_case(name, queue):
+    fn, args, _ = CASES[name]
+    # Cases time their own hot path so imports and input setup are excluded
+    rows, timed = fn(*args)
+    queue.put({
+        'wall_s': timed.wall_s,
+        'rows': rows,
+        'rows_per_s': rows / timed.wall_s if timed.wall_s else None,
+        'peak_rss_mb': timed.peak_rss_mb,
+    })
+
+
+def _run_once(ctx, name, timeout):
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(name, queue))
+    proc.start()
+    deadline = time.monotonic() + timeout
+    run = None
+    try:
+        while run is None:
+            try:
+                run = queue.get(timeout=1)
+            except queue_module.Empty:
+                if not proc.is_alive():
+                    # The result may still be in flight from a clean exit
+                    try:
+                        run = queue.get(timeout=1)
+                    except queue_module.Empty:
+                        break
+                elif time.monotonic() > deadline:
+                    raise CaseFailed(f"{name}: no result after {timeout:g}s")
+        proc.join(timeout=10)
+    finally:
+        if proc.is_alive():
+            proc.terminate()
+            proc.join()
+    if proc.exitcode != 0 or run is None:
+        raise CaseFailed(f"{name}: process exited with code {proc.exitcode}")
+    return run
+
+
+def run_case(name, repeat=3, timeout=DEFAULT_TIMEOUT_S):
+    """
+    Runs one case `repeat` times, each in a fresh process, and keeps the
+    fastest run (the least disturbed by other load on the machine).
+    Raises CaseFailed if a run crashes or takes longer than timeout seconds.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    runs = [_run_once(ctx, name, timeout) for _ in range(repeat)]
+    best = min(runs, key=lambda r: r['wall_s'])
+    best['wall_s_runs'] = [r['wall_s'] for r in runs]
+    return best
+
+
+def environment():
+    import numpy as np
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, min_delta=DEFAULT_MIN_DELTA_S):
+    """
+    Names of cases whose wall time regressed beyond tolerance (and by at
+    least min_delta seconds).
+    """
+    regressions = []
+    for name, result in results['cases'].items():
+        base = baseline.get('cases', {}).get(name)
+        if 'failed' in result:
+            continue
+        if (base and result['wall_s'] > base['wall_s'] * (1 + tolerance)
+                and result['wall_s'] - base['wall_s'] >= min_delta):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--quick', action='store_true', help="skip the 1M/10M-row cases")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), help="cases to run")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs per case; the fastest is recorded (default 3)")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT_S,
+                        help=f"seconds per run before a case fails (default {DEFAULT_TIMEOUT_S})")
+    parser.add_argument('--output', default=RESULTS_PATH, help="results JSON path")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline JSON path")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown before flagging (default 0.25)")
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA_S,
+                        help="ignore slowdowns below this many seconds (default 0.02)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    names = args.cases or [n for n, (_, _, quick) in CASES.items() if quick or not args.quick]
+    results = {'environment': environment(), 'timestamp': time.time(), 'cases': {}}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'case':<16}{'wall s':>10}{'rows/s':>14}{'peak MB':>10}{'vs base':>10}")
+    failures = []
+    for name in names:
+        try:
+            result = run_case(name, args.repeat, args.timeout)
+        except CaseFailed as exc:
+            results['cases'][name] = {'failed': str(exc)}
+            failures.append(name)
+            print(f"{name:<16}FAILED ({exc})")
+            continue
+        results['cases'][name] = result
+        base = baseline.get('cases', {}).get(name)
+        ratio = f"{result['wall_s'] / base['wall_s']:.2f}x" if base else '-'
+        print(f"{name:<16}{result['wall_s']:>10.3f}{result['rows_per_s']:>14,.0f}"
+              f"{result['peak_rss_mb']:>10.1f}{ratio:>10}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if failures:
+        print(f"Failed: {', '.join(failures)}")
+        return 1
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
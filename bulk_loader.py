@@ -0,0 +1,301 @@
+"""
+Bulk loader for the sensor_data table.
+
+Streams readings from the sensor simulator or a sensor_data CSV export into
+PostgreSQL with binary COPY FROM STDIN over a pool of connections. A
+bounded queue between the reader and the copy workers provides
+backpressure, and failed batches are retried in a fresh transaction with
+exponential backoff. Needs psycopg 3 and psycopg_pool:
+
+    pip install "psycopg[binary]" psycopg_pool
+"""
+
+import argparse
+import datetime
+import queue
+import threading
+import time
+
+import numpy as np
+
+import instrumentation
+import spc
+
+COPY_TYPES = ['text', 'float8', 'float8', 'float8', 'int4', 'float8', 'timestamptz']
+COPY_SQL = (f"COPY sensor_data ({', '.join(spc.SENSOR_DATA_COLUMNS)}) "
+            f"FROM STDIN (FORMAT BINARY)")
+INSERT_SQL = (f"INSERT INTO sensor_data ({', '.join(spc.SENSOR_DATA_COLUMNS)}) "
+              f"VALUES ({', '.join(['%s'] * len(spc.SENSOR_DATA_COLUMNS))})")
+
+# Same columns as sensor_schema.sql, for loading into a local Postgres
+CREATE_TABLE_SQL = """
+create table if not exists public.sensor_data (
+  id uuid default gen_random_uuid() primary key,
+  batch_id text not null,
+  temperature float not null,
+  ph float not null,
+  humidity float not null,
+  storage_time integer not null,
+  bacterial_risk float not null,
+  timestamp timestamptz default now() not null
+)
+"""
+
+DEFAULT_BATCH_SIZE = 50_000
+
+
+def iter_simulated_batches(simulator, num_readings, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Regroups sensor_simulator ticks into batches of batch_size readings.
+    """
+    pending = []
+    pending_rows = 0
+    emitted = 0
+    while emitted < num_readings:
+        tick = simulator.tick()
+        take = min(len(tick['batch_id']), num_readings - emitted)
+        pending.append({c: v[:take] for c, v in tick.items()})
+        pending_rows += take
+        emitted += take
+        if pending_rows >= batch_size:
+            yield _concat(pending)
+            pending, pending_rows = [], 0
+    if pending:
+        yield _concat(pending)
+
+
+def iter_csv_batches(path, batch_size=DEFAULT_BATCH_SIZE, errors='raise'):
+    """
+    Reads a sensor_data CSV export in batches of batch_size rows.
+
+    errors='coerce' turns unparseable timestamps into NaT for
+    ingest_validation to reject instead of raising.
+    """
+    import pandas as pd
+
+    for chunk in pd.read_csv(path, chunksize=batch_size, usecols=spc.SENSOR_DATA_COLUMNS):
+        timestamps = pd.to_datetime(chunk['timestamp'], utc=True, errors=errors)
+        batch = {c: chunk[c].to_numpy() for c in spc.SENSOR_DATA_COLUMNS}
+        batch['timestamp'] = timestamps.dt.tz_localize(None).to_numpy()
+        yield batch
+
+
+def _concat(batches):
+    return {c: np.concatenate([b[c] for b in batches]) for c in spc.SENSOR_DATA_COLUMNS}
+
+
+def batch_rows(batch):
+    """
+    A column batch as Python row tuples in COPY_TYPES order.
+    """
+    timestamps = [t.replace(tzinfo=datetime.timezone.utc)
+                  for t in np.asarray(batch['timestamp'], dtype='datetime64[us]').tolist()]
+    return zip([str(b) for b in batch['batch_id']],
+               np.asarray(batch['temperature'], dtype=np.float64).tolist(),
+               np.asarray(batch['ph'], dtype=np.float64).tolist(),
+               np.asarray(batch['humidity'], dtype=np.float64).tolist(),
+               np.asarray(batch['storage_time'], dtype=np.int64).tolist(),
+               np.asarray(batch['bacterial_risk'], dtype=np.float64).tolist(),
+               timestamps)
+
+
+def ensure_table(conninfo):
+    import psycopg
+
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute(CREATE_TABLE_SQL)
+
+
+class BulkLoader:
+    """
+    Copies column batches into sensor_data from pool_size worker threads.
+
+    load() blocks the producer once max_pending batches are queued, so a
+    slow database throttles the reader instead of filling memory. A batch
+    that fails is retried up to max_retries times; after that it is kept
+    in self.failed (with the error) for retry_failed().
+    """
+
+    def __init__(self, conninfo, pool_size=4, max_pending=8, max_retries=3,
+                 retry_backoff=0.5):
+        from psycopg_pool import ConnectionPool
+
+        self.pool = ConnectionPool(conninfo, min_size=pool_size, max_size=pool_size, open=True)
+        self.pool_size = pool_size
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.failed = []
+        self.stats = {'rows': 0, 'batches': 0, 'retries': 0, 'failed_batches': 0}
+        self._lock = threading.Lock()
+
+    def copy_batch(self, batch):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                with cur.copy(COPY_SQL) as copy:
+                    copy.set_types(COPY_TYPES)
+                    for row in batch_rows(batch):
+                        copy.write_row(row)
+        # Leaving pool.connection() commits; an exception rolls back, so a
+        # retried batch is never half-loaded.
+
+    def _copy_with_retry(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.copy_batch(batch)
+            except Exception as error:  # noqa: BLE001 - any DB/network error is retried
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self.failed.append((batch, error))
+                        self.stats['failed_batches'] += 1
+                    return
+                with self._lock:
+                    self.stats['retries'] += 1
+                time.sleep(self.retry_backoff * 2 ** attempt)
+            else:
+                instrumentation.count('bulk_loader_rows', len(batch['batch_id']))
+                with self._lock:
+                    self.stats['rows'] += len(batch['batch_id'])
+                    self.stats['batches'] += 1
+                return
+
+    def _worker(self, pending):
+        while True:
+            batch = pending.get()
+            if batch is None:
+                return
+            self._copy_with_retry(batch)
+
+    def load(self, batches):
+        """
+        Loads every batch from an iterable; returns the cumulative stats
+        with the elapsed seconds and rows/sec of this call.
+        """
+        pending = queue.Queue(maxsize=self.max_pending)
+        workers = [threading.Thread(target=self._worker, args=(pending,), daemon=True)
+                   for _ in range(self.pool_size)]
+        for worker in workers:
+            worker.start()
+
+        rows_before = self.stats['rows']
+        start = time.perf_counter()
+        try:
+            for batch in batches:
+                pending.put(batch)  # blocks while max_pending batches are queued
+                instrumentation.gauge('bulk_loader_queue_depth', pending.qsize())
+        finally:
+            for _ in workers:
+                pending.put(None)
+            for worker in workers:
+                worker.join()
+        elapsed = time.perf_counter() - start
+        loaded = self.stats['rows'] - rows_before
+        return dict(self.stats, seconds=elapsed, rows_per_s=loaded / elapsed if elapsed else 0.0)
+
+    def retry_failed(self):
+        """
+        Resubmits every batch in self.failed.
+        """
+        batches = [batch for batch, _ in self.failed]
+        self.failed = []
+        self.stats['failed_batches'] = 0
+        return self.load(batches)
+
+    def close(self):
+        self.pool.close()
+
+
+def insert_rows(conninfo, batches):
+    """
+    Row-by-row INSERT baseline for benchmarking against BulkLoader.
+    """
+    import psycopg
+
+    rows = 0
+    start = time.perf_counter()
+    with psycopg.connect(conninfo) as conn:
+        with conn.cursor() as cur:
+            for batch in batches:
+                for row in batch_rows(batch):
+                    cur.execute(INSERT_SQL, row)
+                    rows += 1
+    elapsed = time.perf_counter() - start
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_s': rows / elapsed if elapsed else 0.0}
+
+
+def benchmark(conninfo, num_readings=200_000, insert_readings=20_000, batch_size=DEFAULT_BATCH_SIZE,
+              pool_size=4, seed=0):
+    """
+    rows/sec of pooled binary COPY versus one INSERT per row, on simulated readings.
+    """
+    from sensor_simulator import SensorSimulator
+
+    ensure_table(conninfo)
+    loader = BulkLoader(conninfo, pool_size=pool_size)
+    try:
+        copy_stats = loader.load(iter_simulated_batches(
+            SensorSimulator(5_000, rng=seed), num_readings, batch_size))
+    finally:
+        loader.close()
+    insert_stats = insert_rows(conninfo, iter_simulated_batches(
+        SensorSimulator(5_000, rng=seed), insert_readings, batch_size))
+    return {'copy': copy_stats, 'insert': insert_stats}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load readings into sensor_data.")
+    parser.add_argument('--dsn', required=True, help="PostgreSQL connection string")
+    parser.add_argument('--csv', help="sensor_data CSV export to load (default: simulate)")
+    parser.add_argument('--readings', type=int, default=1_000_000,
+                        help="simulated readings to load")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--max-pending', type=int, default=8)
+    parser.add_argument('--create-table', action='store_true',
+                        help="create sensor_data if it does not exist")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="compare COPY against row-by-row INSERT and exit")
+    parser.add_argument('--validate', action='store_true',
+                        help="run readings through ingest_validation before loading")
+    parser.add_argument('--quarantine', help="with --validate, append rejected rows to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        results = benchmark(args.dsn, batch_size=args.batch_size, pool_size=args.pool_size)
+        for name, stats in results.items():
+            print(f"{name:>6}: {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+                  f"({stats['rows_per_s']:,.0f} rows/s)")
+        return
+
+    if args.create_table:
+        ensure_table(args.dsn)
+    if args.csv:
+        batches = iter_csv_batches(args.csv, args.batch_size,
+                                   errors='coerce' if args.validate else 'raise')
+    else:
+        from sensor_simulator import SensorSimulator
+        batches = iter_simulated_batches(SensorSimulator(10_000), args.readings, args.batch_size)
+    validator = None
+    if args.validate:
+        import ingest_validation
+
+        validator = ingest_validation.ReadingValidator(quarantine=args.quarantine)
+        batches = ingest_validation.validate_batches(batches, validator)
+
+    loader = BulkLoader(args.dsn, pool_size=args.pool_size, max_pending=args.max_pending)
+    try:
+        stats = loader.load(batches)
+    finally:
+        loader.close()
+        if validator is not None:
+            validator.close()
+    print(f"Loaded {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_s']:,.0f} rows/s), {stats['retries']} retries, "
+          f"{stats['failed_batches']} failed batches")
+    if validator is not None:
+        rejects = {check: n for check, n in validator.stats()['rejects'].items() if n}
+        print(f"Quarantined {validator.quarantined:,} rows: {rejects}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+Out-of-core analytics over the shelf-life dataset.
+
+One streaming pass over a chunked CSV, Parquet, Feather or npy dataset
+(generate_dataset.iter_dataset_columns) accumulates per-Milk_Type and
+per-Quality_Label aggregates, KLL quantile sketches, fixed-edge histograms
+and the correlation matrix. Every accumulator has bounded size and a
+merge(), so memory does not grow with the row count and partial results
+from parallel workers combine into the same answer as a single pass (up to
+the sketches' rank error).
+"""
+
+import argparse
+import json
+import math
+import resource
+import time
+
+import numpy as np
+
+import generate_dataset as gd
+
+GROUP_COLUMNS = ['Milk_Type', 'Quality_Label']
+
+# column -> (low, high, bins, log10); fixed edges keep histograms mergeable.
+# Values outside [low, high) land in the underflow/overflow counters.
+HISTOGRAM_BINS = {
+    'Temperature_C': (0.0, 25.0, 50, False),
+    'pH': (6.4, 7.0, 30, False),
+    'Initial_Bacteria_CFU': (2.0, 6.0, 40, True),
+    'Fat_Content_Percent': (-0.5, 4.0, 45, False),
+    'Humidity_Percent': (40.0, 90.0, 50, False),
+    'Shelf_Life_Hours': (0.0, 800.0, 80, False),
+}
+
+DEFAULT_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+DEFAULT_SKETCH_K = 200
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty 2016).
+
+    Items live in levels; an item at level h stands for 2^h inputs. When a
+    level outgrows its capacity it is sorted and every other item (random
+    offset) is promoted one level up. Capacities shrink geometrically
+    (factor 2/3) below the top level, so the sketch keeps O(k log(n/k))
+    items and its rank error is roughly 1.7/k.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_K, rng=None):
+        self.k = k
+        self.rng = np.random.default_rng(rng)
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def __len__(self):
+        return sum(len(level) for level in self.levels)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # An odd item out stays behind so the promoted weight is exact
+            keep = items[:len(items) % 2]
+            paired = items[len(items) % 2:]
+            promoted = paired[int(self.rng.integers(2))::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # Capacities depend on the number of levels; recheck from the bottom
+            level = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """
+        Approximate quantiles for q in [0, 1] (scalar or array).
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h)
+                                  for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        result = items[np.minimum(index, len(items) - 1)]
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result
+
+
+def group_order(codes, num_groups):
+    """
+    (order, bounds): a stable sort of codes and the start of each group's
+    run in it, so group g is order[bounds[g]:bounds[g + 1]].
+    """
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(num_groups + 1))
+    return order, bounds
+
+
+class GroupedStats:
+    """
+    count/mean/std/min/max of several columns per integer group code.
+
+    Each chunk is sorted by group once and reduced per run with reduceat,
+    then folded in with the same pairwise (Chan et al.) update as
+    RunningStats, vectorized over groups and columns.
+    """
+
+    def __init__(self, num_groups, columns):
+        self.columns = list(columns)
+        shape = (num_groups, len(self.columns))
+        self.count = np.zeros(num_groups, dtype=np.int64)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+    def update(self, codes, values):
+        """
+        codes: (n,) group codes; values: one (n,) array per column.
+        """
+        codes = np.asarray(codes)
+        order, bounds = group_order(codes, len(self.count))
+        return self.update_sorted([np.asarray(v, dtype=np.float64)[order] for v in values], bounds)
+
+    def update_sorted(self, values, bounds):
+        """
+        update() for columns already sorted by group, with group_order bounds.
+        """
+        other = GroupedStats(len(self.count), self.columns)
+        other.count = np.diff(bounds)
+        present = other.count > 0
+        if not present.any():
+            return self
+        starts = bounds[:-1][present]
+        counts = other.count[present]
+        for j, column in enumerate(values):
+            mean = np.add.reduceat(column, starts) / counts
+            deviation = column - np.repeat(mean, counts)
+            other.mean[present, j] = mean
+            other.m2[present, j] = np.add.reduceat(deviation * deviation, starts)
+            other.min[present, j] = np.minimum.reduceat(column, starts)
+            other.max[present, j] = np.maximum.reduceat(column, starts)
+        return self.merge(other)
+
+    def merge(self, other):
+        n_a = self.count[:, None].astype(np.float64)
+        n_b = other.count[:, None].astype(np.float64)
+        n = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            weight_b = np.where(n > 0, n_b / n, 0)
+            self.m2 = self.m2 + other.m2 + np.where(n > 0, delta * delta * n_a * weight_b, 0)
+            self.mean = self.mean + delta * weight_b
+        self.count = self.count + other.count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def std(self):
+        count = self.count[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 1, np.sqrt(self.m2 / (count - 1)), np.nan)
+
+
+class DatasetAnalytics:
+    """
+    All aggregates for one pass over the dataset; feed chunks with
+    update() and combine workers' results with merge().
+
+    Chunks are dicts of column arrays with categorical columns as codes
+    into gd.CATEGORIES, as produced by iter_dataset_columns or
+    generate_milk_columns. Quantile sketches are kept for every column
+    overall and for group_quantile_columns within each group.
+    """
+
+    def __init__(self, columns=gd.NUMERIC_COLUMNS, group_by=GROUP_COLUMNS,
+                 histogram_bins=HISTOGRAM_BINS, sketch_k=DEFAULT_SKETCH_K,
+                 group_quantile_columns=('Shelf_Life_Hours',), rng=None):
+        self.columns = list(columns)
+        self.group_by = list(group_by)
+        self.histogram_bins = dict(histogram_bins)
+        self.group_quantile_columns = list(group_quantile_columns)
+        if not isinstance(rng, np.random.SeedSequence):
+            rng = np.random.SeedSequence(rng)
+        seeds = rng.spawn(len(self.columns) + sum(len(gd.CATEGORIES[g]) for g in self.group_by)
+                          * len(self.group_quantile_columns))
+        self.overall = gd.RunningStats(self.columns)
+        self.groups = {g: GroupedStats(len(gd.CATEGORIES[g]), self.columns) for g in self.group_by}
+        self.sketches = {c: KLLSketch(sketch_k, seeds.pop()) for c in self.columns}
+        self.group_sketches = {
+            (g, code, c): KLLSketch(sketch_k, seeds.pop())
+            for g in self.group_by for code in range(len(gd.CATEGORIES[g]))
+            for c in self.group_quantile_columns
+        }
+        self.histograms = {c: np.zeros(bins + 2, dtype=np.int64)  # [under, bins..., over]
+                           for c, (_, _, bins, _) in self.histogram_bins.items()}
+
+    @property
+    def count(self):
+        return self.overall.count
+
+    def histogram_edges(self, column):
+        low, high, bins, log = self.histogram_bins[column]
+        edges = np.linspace(low, high, bins + 1)
+        return 10 ** edges if log else edges
+
+    def update(self, chunk):
+        values = {c: np.asarray(chunk[c], dtype=np.float64) for c in self.columns}
+        if len(values[self.columns[0]]) == 0:
+            return self
+        self.overall.update(values)
+        for c in self.columns:
+            self.sketches[c].update(values[c])
+        for g in self.group_by:
+            # One sort per group column serves the aggregates and the sketches
+            order, bounds = group_order(np.asarray(chunk[g]), len(gd.CATEGORIES[g]))
+            ordered = {c: values[c][order] for c in self.columns}
+            self.groups[g].update_sorted([ordered[c] for c in self.columns], bounds)
+            for c in self.group_quantile_columns:
+                for code in range(len(bounds) - 1):
+                    self.group_sketches[g, code, c].update(ordered[c][bounds[code]:bounds[code + 1]])
+        for c, (low, high, bins, log) in self.histogram_bins.items():
+            values_c = values[c]
+            if log:
+                values_c = np.log10(np.maximum(values_c, 1e-300))
+            # Bin index in one pass: 0 is underflow, bins + 1 overflow
+            index = np.floor((values_c - low) * (bins / (high - low))).astype(np.int64) + 1
+            self.histograms[c] += np.bincount(np.clip(index, 0, bins + 1), minlength=bins + 2)
+        return self
+
+    def merge(self, other):
+        self.overall.merge(other.overall)
+        for g in self.group_by:
+            self.groups[g].merge(other.groups[g])
+        for key, sketch in self.sketches.items():
+            sketch.merge(other.sketches[key])
+        for key, sketch in self.group_sketches.items():
+            sketch.merge(other.group_sketches[key])
+        for c in self.histograms:
+            self.histograms[c] += other.histograms[c]
+        return self
+
+    def quantiles(self, column, q=DEFAULT_QUANTILES, group=None):
+        """
+        Approximate quantiles of column, overall or within group=(group
+        column, label), e.g. ('Milk_Type', 'Whole Milk').
+        """
+        if group is None:
+            return self.sketches[column].quantile(q)
+        g, label = group
+        return self.group_sketches[g, gd.CATEGORIES[g].index(label), column].quantile(q)
+
+    def group_summary(self, group_by):
+        """
+        {label: {'count': n, column: {'mean', 'std', 'min', 'max'}}} per group.
+        """
+        stats = self.groups[group_by]
+        std = stats.std()
+        out = {}
+        for code, label in enumerate(gd.CATEGORIES[group_by]):
+            entry = {'count': int(stats.count[code])}
+            for j, c in enumerate(self.columns):
+                entry[c] = {'mean': float(stats.mean[code, j]), 'std': float(std[code, j]),
+                            'min': float(stats.min[code, j]), 'max': float(stats.max[code, j])}
+            out[label] = entry
+        return out
+
+    def batch_comparison(self):
+        """
+        The Analytics page's batchComparison series: average shelf life in
+        days and sample count per milk type.
+        """
+        stats = self.groups['Milk_Type']
+        j = self.columns.index('Shelf_Life_Hours')
+        return [{'type': label, 'avgShelfLife': round(float(stats.mean[code, j]) / 24, 1),
+                 'samples': int(stats.count[code])}
+                for code, label in enumerate(gd.CATEGORIES['Milk_Type']) if stats.count[code]]
+
+    def summary(self, q=DEFAULT_QUANTILES):
+        """
+        Everything as a JSON-serializable dict.
+        """
+        q = list(q)
+        correlation = self.overall.comoment / np.outer(*[np.sqrt(np.diag(self.overall.comoment))] * 2)
+        return {
+            'rows': int(self.count),
+            'columns': {
+                c: {'mean': float(self.overall.mean[j]), 'std': float(self.overall.std()[j]),
+                    'min': float(self.overall.min[j]), 'max': float(self.overall.max[j]),
+                    'quantiles': dict(zip(map(str, q), self.quantiles(c, q).tolist()))}
+                for j, c in enumerate(self.columns)
+            },
+            'groups': {g: self.group_summary(g) for g in self.group_by},
+            'group_quantiles': {
+                g: {label: {c: dict(zip(map(str, q), self.quantiles(c, q, (g, label)).tolist()))
+                            for c in self.group_quantile_columns}
+                    for label in gd.CATEGORIES[g]}
+                for g in self.group_by
+            },
+            'histograms': {
+                c: {'edges': self.histogram_edges(c).tolist(),
+                    'counts': counts[1:-1].tolist(),
+                    'underflow': int(counts[0]), 'overflow': int(counts[-1])}
+                for c, counts in self.histograms.items()
+            },
+            'correlation': {c: dict(zip(self.columns, np.round(correlation[j], 6).tolist()))
+                            for j, c in enumerate(self.columns)},
+            'batch_comparison': self.batch_comparison(),
+        }
+
+
+def _analyze_part(args):
+    path, fmt, part, chunk_size, seed, options = args
+    analytics = DatasetAnalytics(rng=seed, **options)
+    for chunk in gd.iter_dataset_columns(path, fmt, chunk_size=chunk_size, part=part):
+        analytics.update(chunk)
+    return analytics
+
+
+def analyze_dataset(paths, fmt=None, chunk_size=gd.DEFAULT_CHUNK_SIZE, workers=1, seed=0,
+                    **options):
+    """
+    One streaming pass over one or more dataset files.
+
+    With workers > 1 each file is split into `workers` parts (CSV files
+    stay whole) and the parts are analyzed in a process pool, then merged
+    in order. Sketch randomness comes from SeedSequence(seed), so results
+    are reproducible for a given seed, worker count and chunk size.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    units = []
+    for path in paths:
+        path_fmt = fmt or gd.infer_format(path)
+        parts = 1 if path_fmt == 'csv' else workers
+        units += [(path, path_fmt, (i, parts)) for i in range(parts)]
+    seeds = np.random.SeedSequence(seed).spawn(len(units))
+    tasks = [unit + (chunk_size, s, options) for unit, s in zip(units, seeds)]
+
+    if workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_analyze_part, tasks))
+    else:
+        results = [_analyze_part(task) for task in tasks]
+    analytics = results[0]
+    for other in results[1:]:
+        analytics.merge(other)
+    return analytics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming analytics over shelf-life datasets.")
+    parser.add_argument('paths', nargs='+', help="dataset files (csv, parquet, feather, npy dir)")
+    parser.add_argument('--format', choices=sorted(gd.OUTPUT_FORMATS), help="default: inferred")
+    parser.add_argument('--chunk-size', type=int, default=gd.DEFAULT_CHUNK_SIZE)
+    parser.add_argument('-j', '--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="write the summary JSON here")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    analytics = analyze_dataset(args.paths, args.format, args.chunk_size, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+    summary = analytics.summary()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{summary['rows']:,} rows in {elapsed:.2f}s, peak RSS {peak_mb:.0f} MB")
+    for entry in summary['batch_comparison']:
+        print(f"  {entry['type']:<14} {entry['samples']:>10,} samples, "
+              f"avg shelf life {entry['avgShelfLife']} days")
+    shelf = summary['columns']['Shelf_Life_Hours']['quantiles']
+    print("  Shelf life quantiles (h): " + ", ".join(f"p{float(k) * 100:g}={v:.0f}"
+                                                     for k, v in shelf.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+First-expired-first-out dispatch over predicted shelf life.
+
+FefoScheduler keeps every live batch's predicted expiry (prediction time
+plus remaining shelf life) in a binary min-heap, so "next N batches to
+ship" and "batches expiring within T hours" cost O(log n) per batch
+returned. Each heap entry is one int, the expiry in whole seconds shifted
+left by SLOT_BITS with the batch's slot in the low bits, which keeps a
+million-entry heap around 40 MB and lets heapq compare entries in C.
+
+New predictions are applied in bulk: keys are computed with NumPy and a
+changed key is pushed as a new entry. The entry it replaces stays in the
+heap until it surfaces or the next compaction and is recognised as stale
+because it no longer matches the slot's current key in the key array.
+"""
+
+import argparse
+import heapq
+import time
+
+import numpy as np
+
+import instrumentation
+
+# Low bits of a heap key hold the slot: up to 16.7M live batches
+SLOT_BITS = 24
+SLOT_MASK = (1 << SLOT_BITS) - 1
+# Rebuild the heap once stale entries outnumber live ones by this factor
+COMPACT_RATIO = 2
+MIN_COMPACT_SIZE = 4096
+
+
+def _epoch_seconds(values, n):
+    """
+    Epoch seconds as float64 from None/scalar/array seconds or datetime64.
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ms]').astype(np.int64) / 1000.0
+    return np.broadcast_to(values.astype(np.float64), (n,))
+
+
+class FefoScheduler:
+    """
+    Live batches ordered by predicted expiry.
+
+    Timestamps are epoch seconds (or datetime64); clock supplies "now"
+    when a call does not.
+    """
+
+    def __init__(self, clock=time.time, capacity=1024):
+        self.clock = clock
+        self._keys = np.full(capacity, -1, dtype=np.int64)  # slot -> current key, -1 free
+        self._batch_ids = [None] * capacity                 # slot -> batch_id
+        self._slots = {}                                    # batch_id -> slot
+        self._free = []       # slots with no entry left in the heap
+        self._released = []   # freed slots that may still have stale heap entries
+        self._next_slot = 0
+        self._heap = []
+        self.updates = 0
+        self.compactions = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, batch_id):
+        return batch_id in self._slots
+
+    def _slot_for(self, batch_id):
+        slot = self._slots.get(batch_id)
+        if slot is not None:
+            return slot
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = self._next_slot
+            if slot > SLOT_MASK:
+                raise OverflowError(f"FefoScheduler holds at most {SLOT_MASK + 1:,} batches")
+            self._next_slot += 1
+            if slot == len(self._keys):
+                self._keys = np.concatenate([self._keys, np.full(len(self._keys), -1, np.int64)])
+                self._batch_ids.extend([None] * (len(self._keys) - len(self._batch_ids)))
+        self._slots[batch_id] = slot
+        self._batch_ids[slot] = batch_id
+        return slot
+
+    def update(self, batch_ids, shelf_life_hours, as_of=None):
+        """
+        Sets each batch's expiry to as_of + shelf_life_hours, adding
+        batches not seen before. as_of defaults to the clock; it may be a
+        scalar or one timestamp per batch (e.g. the readings' timestamps).
+        Returns the number of batches whose expiry changed.
+        """
+        hours = np.asarray(shelf_life_hours, dtype=np.float64).ravel()
+        n = len(hours)
+        if n == 0:
+            return 0
+        as_of = _epoch_seconds(self.clock() if as_of is None else as_of, n)
+        slots = np.fromiter((self._slot_for(b) for b in batch_ids), dtype=np.int64, count=n)
+        expiry = np.floor(as_of + hours * 3600).astype(np.int64)
+        keys = (expiry << SLOT_BITS) | slots
+        changed = keys != self._keys[slots]
+        keys = keys[changed]
+        self._keys[slots[changed]] = keys
+
+        if len(keys) > len(self._heap) // 4:
+            # Bulk loads: re-heapifying beats pushing one by one
+            self._rebuild()
+        else:
+            push = heapq.heappush
+            heap = self._heap
+            for key in keys.tolist():
+                push(heap, key)
+            self._maybe_compact()
+        self.updates += len(keys)
+        instrumentation.count('fefo_updates', len(keys))
+        instrumentation.gauge('fefo_live_batches', len(self._slots))
+        return len(keys)
+
+    def remove(self, batch_ids):
+        """
+        Drops batches (shipped, discarded); unknown ids are ignored.
+        """
+        for batch_id in batch_ids:
+            slot = self._slots.pop(batch_id, None)
+            if slot is not None:
+                self._release(slot)
+        self._maybe_compact()
+
+    def _release(self, slot):
+        self._keys[slot] = -1
+        self._batch_ids[slot] = None
+        self._released.append(slot)
+
+    def _valid(self, key):
+        return self._keys[key & SLOT_MASK] == key
+
+    def _rebuild(self):
+        live = self._keys[:self._next_slot]
+        self._heap = live[live >= 0].tolist()
+        heapq.heapify(self._heap)
+        # No stale entries remain, so released slots are safe to reuse
+        self._free.extend(self._released)
+        self._released.clear()
+        self.compactions += 1
+
+    def _maybe_compact(self):
+        if len(self._heap) > max(MIN_COMPACT_SIZE, COMPACT_RATIO * len(self._slots)):
+            self._rebuild()
+
+    def _drop_stale_top(self):
+        heap = self._heap
+        while heap and not self._valid(heap[0]):
+            heapq.heappop(heap)
+
+    def expiry(self, batch_id):
+        """
+        Predicted expiry of one batch in epoch seconds, or None.
+        """
+        slot = self._slots.get(batch_id)
+        return None if slot is None else int(self._keys[slot]) >> SLOT_BITS
+
+    def _result(self, keys, now):
+        keys = np.asarray(keys, dtype=np.int64)
+        expires_at = keys >> SLOT_BITS
+        now = self.clock() if now is None else float(_epoch_seconds(now, 1)[0])
+        return {
+            'batch_id': np.array([self._batch_ids[s] for s in (keys & SLOT_MASK).tolist()],
+                                 dtype=object),
+            'expires_at': expires_at,
+            'remaining_hours': (expires_at - now) / 3600,
+        }
+
+    def peek(self, n, now=None):
+        """
+        The n batches that expire first, soonest first, without removing
+        them: a best-first walk of the heap, O(n log n).
+        """
+        self._drop_stale_top()
+        heap = self._heap
+        keys = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(keys) < n:
+            key, i = heapq.heappop(frontier)
+            if self._valid(key) and (not keys or key != keys[-1]):
+                keys.append(key)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return self._result(keys, now)
+
+    def pop(self, n, now=None):
+        """
+        Removes and returns the n batches that expire first (ship them).
+        """
+        heap = self._heap
+        keys = []
+        while heap and len(keys) < n:
+            key = heapq.heappop(heap)
+            if self._valid(key):
+                # Invalidate right away: a batch updated away from a key and
+                # back has a second copy of it further down the heap
+                self._keys[key & SLOT_MASK] = -1
+                keys.append(key)
+        result = self._result(keys, now)
+        for batch_id, key in zip(result['batch_id'], keys):
+            del self._slots[batch_id]
+            self._release(key & SLOT_MASK)
+        return result
+
+    def expiring_within(self, hours, now=None):
+        """
+        Batches whose predicted expiry is at most hours from now (already
+        expired included), soonest first. Only heap nodes below the cutoff
+        are visited.
+        """
+        now_s = self.clock() if now is None else float(_epoch_seconds(now, 1)[0])
+        cutoff = (int(np.floor(now_s + hours * 3600)) + 1) << SLOT_BITS
+        heap = self._heap
+        keys = []
+        stack = [0] if heap else []
+        while stack:
+            i = stack.pop()
+            key = heap[i]
+            if key >= cutoff:
+                continue
+            if self._valid(key):
+                keys.append(key)
+            stack.extend(c for c in (2 * i + 1, 2 * i + 2) if c < len(heap))
+        # A key pushed twice (updated away and back) is listed once
+        return self._result(sorted(set(keys)), now_s)
+
+    def stats(self):
+        return {
+            'live': len(self._slots),
+            'heap_entries': len(self._heap),
+            'stale_entries': len(self._heap) - len(self._slots),
+            'updates': self.updates,
+            'compactions': self.compactions,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the FEFO scheduler.")
+    parser.add_argument('--batches', type=int, default=1_000_000, help="live batches")
+    parser.add_argument('--ticks', type=int, default=100, help="prediction update rounds")
+    parser.add_argument('--tick-size', type=int, default=20_000,
+                        help="batches re-predicted per round")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    now = 1_750_000_000.0
+
+    def clock():
+        return now
+
+    scheduler = FefoScheduler(clock=clock)
+    batch_ids = np.array([f"BATCH-{i:07d}" for i in range(args.batches)], dtype=object)
+
+    start = time.perf_counter()
+    scheduler.update(batch_ids, rng.uniform(0, 300, args.batches))
+    print(f"Loaded {args.batches:,} batches in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        now += 60
+        idx = rng.integers(0, args.batches, args.tick_size)
+        scheduler.update(batch_ids[idx], rng.uniform(0, 300, args.tick_size))
+    elapsed = time.perf_counter() - start
+    print(f"{args.ticks} rounds of {args.tick_size:,} updates: "
+          f"{elapsed / args.ticks * 1000:.1f}ms per round, "
+          f"{elapsed / (args.ticks * args.tick_size) * 1e6:.2f}us per update")
+
+    for label, call in (("next 100", lambda: scheduler.peek(100)),
+                        ("expiring within 1h", lambda: scheduler.expiring_within(1)),
+                        ("ship 1,000", lambda: scheduler.pop(1000))):
+        start = time.perf_counter()
+        result = call()
+        print(f"{label}: {len(result['batch_id']):,} batches in "
+              f"{(time.perf_counter() - start) * 1000:.2f}ms")
+    print(scheduler.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,371 @@
+"""
+Inline data-quality stage for readings bound for sensor_data.
+
+ReadingValidator takes the column batches that bulk_loader streams
+(iter_simulated_batches, iter_csv_batches) and returns clean batches:
+
+- type checks coerce every column (text from CSV exports included) and
+  reject missing batch ids, non-numeric values and unparseable timestamps;
+- range checks reject values outside RANGES, e.g. temperatures outside the
+  0-25°C the generator and the simulator clamp to;
+- a reading whose (batch_id, timestamp) was already accepted within
+  dedup_window_s of event time is a duplicate; keys are 64-bit hashes kept
+  in sorted NumPy segments, so lookups are vectorized and memory is 8
+  bytes per reading in the window;
+- rows are held back until the watermark (newest timestamp seen minus
+  lateness_s) passes them and are released in timestamp order; a row
+  older than an already released watermark is rejected as late.
+
+Rejected rows go to an optional quarantine CSV with a reason column, and
+every failed check increments a per-check counter (a row failing several
+checks counts once per check).
+"""
+
+import argparse
+import collections
+import os
+import time
+
+import numpy as np
+
+import instrumentation
+import spc
+
+NUMERIC_COLUMNS = ['temperature', 'ph', 'humidity', 'storage_time', 'bacterial_risk']
+
+# Inclusive bounds per column; temperature matches the 0-25°C clamp of
+# generate_dataset and sensor_simulator
+RANGES = {
+    'temperature': (0.0, 25.0),
+    'ph': (4.5, 8.0),
+    'humidity': (0.0, 100.0),
+    'storage_time': (0, 60 * 24 * 90),  # minutes, 90 days
+    'bacterial_risk': (0.0, 1.0),
+}
+
+DEFAULT_LATENESS_S = 30
+DEFAULT_DEDUP_WINDOW_S = 300
+# Dedup segments are merged pairwise once there are more than this many
+MAX_DEDUP_SEGMENTS = 8
+# Golden-ratio multiplier that spreads timestamps before mixing into keys
+_KEY_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if values.dtype.kind in 'fiub':
+        return values.astype(np.float64)
+    import pandas as pd
+
+    return pd.to_numeric(values, errors='coerce').astype(np.float64)
+
+
+def _as_timestamp_ms(values):
+    values = np.asarray(values)
+    if values.dtype.kind != 'M':
+        import pandas as pd
+
+        values = pd.to_datetime(values, utc=True, errors='coerce').tz_localize(None).to_numpy()
+    return values.astype('datetime64[ms]')
+
+
+class QuarantineWriter:
+    """
+    Appends rejected rows, as received, to a CSV with the sensor_data
+    columns plus 'reason'.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._header = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='')
+
+    def write(self, batch, rows, reasons):
+        import pandas as pd
+
+        frame = pd.DataFrame({c: np.asarray(batch[c])[rows] for c in spc.SENSOR_DATA_COLUMNS})
+        if frame['timestamp'].dtype.kind == 'M':
+            frame['timestamp'] = np.datetime_as_string(
+                frame['timestamp'].to_numpy().astype('datetime64[ms]'), unit='ms',
+                timezone='UTC')
+        frame['reason'] = reasons
+        frame.to_csv(self._file, index=False, header=self._header)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class ReadingValidator:
+    """
+    Validates, deduplicates and reorders column batches of readings.
+
+    process() returns the rows released by this batch (possibly none) as
+    a batch with float64 numeric columns, int64 storage_time and
+    datetime64[ms] timestamps; flush() releases the rest at end of stream.
+    """
+
+    CHECKS = ([f'type:{c}' for c in ['batch_id'] + NUMERIC_COLUMNS + ['timestamp']]
+              + [f'range:{c}' for c in RANGES] + ['late', 'duplicate'])
+
+    def __init__(self, lateness_s=DEFAULT_LATENESS_S, dedup_window_s=DEFAULT_DEDUP_WINDOW_S,
+                 quarantine=None, ranges=None):
+        self.lateness_ms = int(lateness_s * 1000)
+        self.dedup_window_ms = int(dedup_window_s * 1000)
+        self.ranges = {**RANGES, **(ranges or {})}
+        self.quarantine = QuarantineWriter(quarantine) if isinstance(quarantine, str) else quarantine
+        self.rejects = collections.Counter({check: 0 for check in self.CHECKS})
+        self.rows_in = 0
+        self.rows_out = 0
+        self.quarantined = 0
+        self._pending = []     # ts-sorted batches awaiting the watermark
+        self._segments = []    # (newest ts ms, sorted unique keys) of accepted readings
+        self._max_ts = None
+        self._watermark = None  # everything at or before this has been released
+
+    def _reject(self, reasons, check, mask):
+        n = int(np.count_nonzero(mask))
+        if n:
+            self.rejects[check] += n
+            instrumentation.count(f"validation_{check.replace(':', '_')}_rejects", n)
+            # Keep the first failing check (1-based index into CHECKS) as
+            # the row's quarantine reason
+            reasons[mask & (reasons == 0)] = self.CHECKS.index(check) + 1
+
+    def _keys(self, batch_ids, timestamp_ms):
+        import pandas as pd
+
+        ids = pd.util.hash_array(np.asarray(batch_ids, dtype=object))
+        return ids ^ (timestamp_ms.astype(np.uint64) * _KEY_MIX)
+
+    def _seen(self, keys):
+        # keys are sorted, so the binary searches walk each segment in order
+        seen = np.zeros(len(keys), dtype=bool)
+        for _, segment in self._segments:
+            idx = np.minimum(np.searchsorted(segment, keys), len(segment) - 1)
+            seen |= segment[idx] == keys
+        return seen
+
+    def _remember(self, keys, newest_ms):
+        """
+        Adds sorted keys that no segment holds yet.
+        """
+        self._segments.append((newest_ms, keys))
+        if len(self._segments) > MAX_DEDUP_SEGMENTS:
+            # Segments are disjoint, so merging is a sort of two sorted runs
+            segments = self._segments
+            self._segments = [(max(a[0], b[0]), np.sort(np.concatenate([a[1], b[1]]),
+                                                        kind='stable'))
+                              for a, b in zip(segments[0::2], segments[1::2])]
+            if len(segments) % 2:
+                self._segments.append(segments[-1])
+
+    def _expire(self):
+        horizon = self._watermark - self.dedup_window_ms
+        self._segments = [s for s in self._segments if s[0] >= horizon]
+
+    @instrumentation.timed('ReadingValidator.process',
+                           rows=lambda result: len(result['batch_id']))
+    def process(self, batch):
+        import pandas as pd
+
+        n = len(batch['batch_id'])
+        self.rows_in += n
+        reasons = np.zeros(n, dtype=np.int8)
+
+        batch_ids = np.asarray(batch['batch_id'], dtype=object)
+        self._reject(reasons, 'type:batch_id', pd.isna(batch_ids) | (batch_ids == ''))
+        columns = {}
+        for c in NUMERIC_COLUMNS:
+            values = _as_float(batch[c])
+            self._reject(reasons, f'type:{c}', ~np.isfinite(values))
+            columns[c] = values
+        timestamp = _as_timestamp_ms(batch['timestamp'])
+        self._reject(reasons, 'type:timestamp', np.isnat(timestamp))
+        for c, (low, high) in self.ranges.items():
+            values = columns[c]
+            with np.errstate(invalid='ignore'):
+                self._reject(reasons, f'range:{c}', np.isfinite(values)
+                             & ((values < low) | (values > high)))
+
+        ts_ms = timestamp.astype(np.int64)
+        ok = reasons == 0
+        if self._watermark is not None:
+            self._reject(reasons, 'late', ok & (ts_ms <= self._watermark))
+            ok = reasons == 0
+
+        # One stable sort of the keys finds repeats within the batch (all
+        # but the first arrival) and feeds the segment lookups
+        rows = np.flatnonzero(ok)
+        keys = self._keys(batch_ids[rows], ts_ms[rows])
+        by_key = np.argsort(keys, kind='stable')
+        sorted_keys = keys[by_key]
+        repeat = np.zeros(len(rows), dtype=bool)
+        repeat[1:] = sorted_keys[1:] == sorted_keys[:-1]
+        repeat |= self._seen(sorted_keys)
+        duplicate = np.empty(len(rows), dtype=bool)
+        duplicate[by_key] = repeat
+        dup_mask = np.zeros(n, dtype=bool)
+        dup_mask[rows[duplicate]] = True
+        self._reject(reasons, 'duplicate', dup_mask)
+
+        rejected = np.flatnonzero(reasons)
+        if len(rejected):
+            self.quarantined += len(rejected)
+            if self.quarantine is not None:
+                self.quarantine.write(batch, rejected,
+                                      np.array(self.CHECKS)[reasons[rejected] - 1])
+
+        accepted = rows[~duplicate]
+        if len(accepted):
+            accepted_ts = ts_ms[accepted]
+            newest = int(accepted_ts.max())
+            self._remember(sorted_keys[~repeat], newest)
+            order = accepted[np.argsort(accepted_ts, kind='stable')]
+            self._pending.append({
+                'batch_id': batch_ids[order],
+                **{c: columns[c][order] for c in NUMERIC_COLUMNS},
+                'timestamp': ts_ms[order],
+            })
+            self._max_ts = newest if self._max_ts is None else max(self._max_ts, newest)
+        if self._max_ts is None:
+            return self._release(None)
+        watermark = self._max_ts - self.lateness_ms
+        if self._watermark is None or watermark > self._watermark:
+            self._watermark = watermark
+            self._expire()
+        return self._release(self._watermark)
+
+    def flush(self):
+        """
+        Releases every held-back row; later rows older than the newest
+        timestamp seen count as late.
+        """
+        if self._max_ts is not None:
+            self._watermark = self._max_ts
+            self._expire()
+        return self._release(self._watermark)
+
+    def _release(self, watermark):
+        parts, pending = [], []
+        for chunk in self._pending:
+            cut = (np.searchsorted(chunk['timestamp'], watermark, side='right')
+                   if watermark is not None else 0)
+            if cut:
+                parts.append({c: v[:cut] for c, v in chunk.items()})
+            if cut < len(chunk['timestamp']):
+                pending.append({c: v[cut:] for c, v in chunk.items()} if cut else chunk)
+        self._pending = pending
+        instrumentation.gauge('validation_pending_rows',
+                              sum(len(c['timestamp']) for c in pending))
+
+        if not parts:
+            parts = [{c: np.empty(0, dtype=object if c == 'batch_id' else np.float64)
+                      for c in spc.SENSOR_DATA_COLUMNS}]
+        merged = {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+        if len(parts) > 1:
+            order = np.argsort(merged['timestamp'], kind='stable')
+            merged = {c: v[order] for c, v in merged.items()}
+        merged['storage_time'] = merged['storage_time'].astype(np.int64)
+        merged['timestamp'] = merged['timestamp'].astype('datetime64[ms]')
+        self.rows_out += len(merged['batch_id'])
+        return {c: merged[c] for c in spc.SENSOR_DATA_COLUMNS}
+
+    def stats(self):
+        return {
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'quarantined': self.quarantined,
+            'pending': sum(len(c['timestamp']) for c in self._pending),
+            'dedup_keys': sum(len(s) for _, s in self._segments),
+            'rejects': dict(self.rejects),
+        }
+
+    def close(self):
+        if self.quarantine is not None:
+            self.quarantine.close()
+
+
+def validate_batches(batches, validator):
+    """
+    Runs a batch stream through validator, yielding the non-empty
+    released batches and finally the flushed remainder.
+    """
+    for batch in batches:
+        out = validator.process(batch)
+        if len(out['batch_id']):
+            yield out
+    out = validator.flush()
+    if len(out['batch_id']):
+        yield out
+
+
+def inject_faults(batch, rng, duplicate_rate=0.01, invalid_rate=0.005, jitter_s=20,
+                  late_rate=0.001, late_s=600):
+    """
+    Copy of a clean batch with duplicated rows, out-of-range and
+    non-numeric values, shuffled order with timestamp jitter and a few
+    very late rows, for benchmarking the validator.
+    """
+    n = len(batch['batch_id'])
+    idx = np.concatenate([np.arange(n), rng.integers(0, n, int(n * duplicate_rate))])
+    out = {c: np.asarray(v)[idx] for c, v in batch.items()}
+    m = len(idx)
+    jitter = rng.integers(-jitter_s * 1000, 1, m).astype('timedelta64[ms]')
+    jitter[rng.random(m) < late_rate] -= np.timedelta64(late_s * 1000, 'ms')
+    # Duplicates keep the original timestamp so they hash to the same key
+    jitter[n:] = jitter[idx[n:]]
+    out['timestamp'] = out['timestamp'].astype('datetime64[ms]') + jitter
+    out['temperature'] = out['temperature'].astype(np.float64)
+    bad = rng.random(m) < invalid_rate
+    out['temperature'][bad] = rng.choice([-40.0, 99.0, np.nan], int(bad.sum()))
+    order = rng.permutation(m)
+    return {c: v[order] for c, v in out.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and deduplicate sensor readings.")
+    parser.add_argument('--csv', help="sensor_data CSV export to validate (default: simulate)")
+    parser.add_argument('--readings', type=int, default=1_000_000,
+                        help="simulated readings, with injected faults")
+    parser.add_argument('--batch-size', type=int, default=50_000)
+    parser.add_argument('--lateness', type=float, default=DEFAULT_LATENESS_S,
+                        help="seconds to wait for out-of-order rows")
+    parser.add_argument('--dedup-window', type=float, default=DEFAULT_DEDUP_WINDOW_S,
+                        help="seconds of event time checked for duplicates")
+    parser.add_argument('--quarantine', help="append rejected rows to this CSV")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import bulk_loader
+
+    if args.csv:
+        batches = bulk_loader.iter_csv_batches(args.csv, args.batch_size, errors='coerce')
+    else:
+        from sensor_simulator import SensorSimulator
+
+        rng = np.random.default_rng(args.seed)
+        clean = bulk_loader.iter_simulated_batches(
+            SensorSimulator(10_000, sim_seconds_per_tick=1, rng=args.seed), args.readings,
+            args.batch_size)
+        batches = [inject_faults(batch, rng) for batch in clean]
+
+    validator = ReadingValidator(args.lateness, args.dedup_window, args.quarantine)
+    start = time.perf_counter()
+    try:
+        for _ in validate_batches(batches, validator):
+            pass
+    finally:
+        validator.close()
+    elapsed = time.perf_counter() - start
+    stats = validator.stats()
+    print(f"{stats['rows_in']:,} rows in {elapsed:.2f}s ({stats['rows_in'] / elapsed:,.0f} rows/s): "
+          f"{stats['rows_out']:,} passed, {stats['quarantined']:,} quarantined")
+    for check, count in stats['rejects'].items():
+        if count:
+            print(f"  {check:<22}{count:>10,}")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
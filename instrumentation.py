@@ -0,0 +1,309 @@
+"""
+Opt-in hot-path instrumentation: timers, counters, gauges and a sampling
+profiler.
+
+Off by default. Every hook first checks one module flag, so a disabled
+@timed function costs a single extra call and a disabled counter or gauge
+returns immediately. Turn it on with enable() or by setting
+DAIRYGUARD_METRICS to an export path before the first import; the
+metrics are then written at exit as Prometheus text ('.prom' or '.txt')
+or appended as one JSON line per export (anything else), and the
+profiler's collapsed stacks go next to them in '<path>.folded', ready for
+flamegraph.pl or speedscope.
+
+Only stdlib is imported here so generate_dataset can use the hooks
+without slowing its start-up.
+"""
+
+import atexit
+import collections
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+METRIC_PREFIX = 'dairyguard'
+ENV_VAR = 'DAIRYGUARD_METRICS'
+DEFAULT_SAMPLE_INTERVAL_S = 0.005
+# Frames kept per sampled stack, innermost last
+MAX_STACK_DEPTH = 64
+
+_enabled = False
+_lock = threading.Lock()
+_timers = {}    # name -> [calls, seconds, max seconds, rows]
+_counters = collections.Counter()
+_gauges = {}
+_profiler = None
+
+
+def enabled():
+    return _enabled
+
+
+def enable(profile=True, sample_interval=DEFAULT_SAMPLE_INTERVAL_S):
+    """
+    Starts collecting; with profile=True also starts the sampling profiler.
+    """
+    global _enabled, _profiler
+    _enabled = True
+    if profile and _profiler is None:
+        _profiler = SamplingProfiler(sample_interval)
+        _profiler.start()
+
+
+def disable():
+    """
+    Stops collecting and stops the profiler; collected data is kept.
+    """
+    global _enabled
+    _enabled = False
+    if _profiler is not None:
+        _profiler.stop()
+
+
+def reset():
+    global _profiler
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _gauges.clear()
+    if _profiler is not None:
+        _profiler.stop()
+        _profiler = None
+
+
+def record_time(name, seconds, rows=0):
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = [0, 0.0, 0.0, 0]
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] = max(timer[2], seconds)
+        timer[3] += rows
+
+
+def count(name, value=1):
+    """
+    Adds value to a monotonic counter.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] += value
+
+
+def gauge(name, value):
+    """
+    Sets a gauge (e.g. a queue depth or a hit rate) to its latest value.
+    """
+    if not _enabled:
+        return
+    _gauges[name] = float(value)
+
+
+class _Timer:
+    __slots__ = ('name', 'rows', 'start')
+
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+
+    def add_rows(self, rows):
+        self.rows += rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_time(self.name, time.perf_counter() - self.start, self.rows)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def add_rows(self, rows):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, rows=0):
+    """
+    Context manager timing its block under name; rows (or add_rows() on
+    the yielded timer) feed the rows/sec rate.
+    """
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name, rows)
+
+
+def timed(name=None, rows=None):
+    """
+    Decorator timing every call of a function.
+
+    rows, if given, maps the return value to the number of rows it
+    covers, e.g. len for a DataFrame.
+    """
+    def decorate(fn):
+        metric = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            record_time(metric, time.perf_counter() - start,
+                        rows(result) if rows is not None else 0)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def column_rows(column):
+    """
+    rows= helper for functions returning a dict of equal-length arrays.
+    """
+    return lambda result: len(result[column])
+
+
+class SamplingProfiler:
+    """
+    Samples every other thread's Python stack each interval seconds from a
+    daemon thread and counts identical stacks.
+
+    Sampling costs the profiled threads only the GIL hand-offs, so the
+    overhead stays around a percent at the default 5 ms interval.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='dairyguard-profiler',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        """
+        Collapsed-stack text: 'outer;...;inner count' per line.
+        """
+        return ''.join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def snapshot():
+    """
+    Current metrics as a JSON-serializable dict.
+    """
+    with _lock:
+        timers = {name: {'calls': calls, 'seconds': seconds, 'max_seconds': longest,
+                         'rows': rows, 'rows_per_s': rows / seconds if seconds else 0.0}
+                  for name, (calls, seconds, longest, rows) in _timers.items()}
+        counters = dict(_counters)
+    return {
+        'timestamp': time.time(),
+        'timers': timers,
+        'counters': counters,
+        'gauges': dict(_gauges),
+        'profile_samples': _profiler.samples if _profiler is not None else 0,
+    }
+
+
+def _metric_name(*parts):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', '_'.join((METRIC_PREFIX,) + parts))
+
+
+def prometheus_text(data=None):
+    """
+    A snapshot in the Prometheus text exposition format.
+    """
+    data = data or snapshot()
+    lines = []
+
+    def metric(name, kind, samples):
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{labels} {value!r}" for labels, value in samples)
+
+    timers = sorted(data['timers'].items())
+    for field, suffix, kind in (('calls', 'calls_total', 'counter'),
+                                ('seconds', 'seconds_total', 'counter'),
+                                ('max_seconds', 'max_seconds', 'gauge'),
+                                ('rows', 'rows_total', 'counter'),
+                                ('rows_per_s', 'rows_per_second', 'gauge')):
+        if timers:
+            metric(_metric_name('timer', suffix), kind,
+                   [(f'{{name="{name}"}}', t[field]) for name, t in timers])
+    for name, value in sorted(data['counters'].items()):
+        metric(_metric_name(name, 'total'), 'counter', [('', value)])
+    for name, value in sorted(data['gauges'].items()):
+        metric(_metric_name(name), 'gauge', [('', value)])
+    return '\n'.join(lines) + '\n'
+
+
+def export(path):
+    """
+    Writes the metrics to path (Prometheus text for .prom/.txt, otherwise
+    one appended JSON line) and the profile, if any, to path + '.folded'.
+    """
+    data = snapshot()
+    if path.endswith(('.prom', '.txt')):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(prometheus_text(data))
+        os.replace(tmp_path, path)
+    else:
+        with open(path, 'a') as f:
+            f.write(json.dumps(data) + '\n')
+    if _profiler is not None and _profiler.samples:
+        with open(f"{path}.folded", 'w') as f:
+            f.write(_profiler.folded())
+
+
+def _export_at_exit(path):
+    disable()
+    export(path)
+
+
+if os.environ.get(ENV_VAR):
+    enable()
+    atexit.register(_export_at_exit, os.environ[ENV_VAR])
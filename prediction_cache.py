@@ -0,0 +1,289 @@
+"""
+Memoized shelf-life scoring keyed on quantized sensor state.
+
+Cold-room readings repeat heavily once rounded to sensor resolution, so
+PredictionCache quantizes each reading (temperature 0.1 °C, pH 0.01,
+bacteria in 0.01 log10 CFU buckets, fat 0.01 %, humidity 0.1 %, milk
+type), packs the tuple into one int64 key and only scores the keys it has
+not seen. Entries live in a bounded LRU with an optional TTL. Buckets are
+split at the edge model's thresholds, so a cached score never moves a
+reading across a risk flag or step penalty.
+"""
+
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import instrumentation
+import shelf_life_model as slm
+
+INPUTS = ['temperature', 'ph', 'bacteria_count', 'humidity', 'fat_content', 'milk_type']
+
+# (resolution, offset, bits) per quantized field; offsets keep the codes
+# non-negative and the bit widths add up to 60 so keys fit in an int64.
+QUANTIZATION = {
+    'temperature': (0.1, 2048, 12),   # -204.8 .. 204.7 °C
+    'ph': (0.01, 0, 11),              # 0 .. 20.47
+    'log_bacteria': (0.01, 0, 11),    # 10^0 .. 10^20.47 CFU
+    'fat_content': (0.01, 0, 11),     # 0 .. 20.47 %
+    'humidity': (0.1, 0, 11),         # 0 .. 204.7 %
+    'milk_type': (1, 0, 4),
+}
+
+# Thresholds of the edge model's risk flags and step penalties, as
+# (input, comparison, value). A reading is always scored at a bucket
+# centre on the same side of each of them as the reading itself.
+BREAKPOINTS = [
+    ('temperature', '>', slm.RISK_TEMPERATURE_C),
+    ('ph', '<', slm.RISK_PH),
+    ('bacteria_count', '>', 30000),
+    ('bacteria_count', '>', slm.RISK_BACTERIA_CFU),
+    ('humidity', '>', 80),
+    ('fat_content', '>', 3.5),
+]
+
+
+def default_scorer(inputs):
+    """
+    shelf_life_model scoring at the mean base (a cached random jitter
+    would be meaningless); milk type is ignored.
+    """
+    return slm.predict_shelf_life(inputs['temperature'], inputs['ph'], inputs['bacteria_count'],
+                                  inputs['humidity'], inputs['fat_content'],
+                                  base_hours=slm.MEAN_BASE_HOURS)
+
+
+def artifact_scorer(artifact):
+    """
+    Scorer for a train_models artifact (the fitted ensemble and classifier),
+    the expensive case the cache is meant for.
+    """
+    import pandas as pd
+
+    import generate_dataset as gd
+    import train_models
+
+    def score(inputs):
+        frame = pd.DataFrame({
+            'Temperature_C': inputs['temperature'],
+            'pH': inputs['ph'],
+            'Initial_Bacteria_CFU': inputs['bacteria_count'],
+            'Fat_Content_Percent': inputs['fat_content'],
+            'Humidity_Percent': inputs['humidity'],
+            'Milk_Type': pd.Categorical.from_codes(inputs['milk_type'],
+                                                   dtype=gd.DATASET_DTYPES['Milk_Type']),
+        })
+        predicted = train_models.predict(artifact, frame)
+        labels = pd.Categorical(predicted['quality_label'], categories=gd.QUALITY_LABELS)
+        return {'shelf_life_hours': predicted['shelf_life_hours'],
+                'quality_code': labels.codes.astype(np.int8)}
+
+    return score
+
+
+def _centre(field, code):
+    # Input value a quantized code stands for, as dequantize() returns it
+    resolution, offset, _ = QUANTIZATION[field]
+    value = (code - offset) * resolution
+    return 10 ** value if field == 'log_bacteria' else value
+
+
+def _first_code_past(field, comparison, threshold):
+    """
+    Lowest code whose centre is at or past a breakpoint: above it for
+    '>', no longer below it for '<'.
+    """
+    resolution, offset, _ = QUANTIZATION[field]
+    raw = np.log10(threshold) if field == 'log_bacteria' else threshold
+    code = int(np.floor(raw / resolution)) + offset - 1
+    past = np.greater if comparison == '>' else np.greater_equal
+    while not past(_centre(field, code), threshold):
+        code += 1
+    while past(_centre(field, code - 1), threshold):
+        code -= 1
+    return code
+
+
+def quantize(inputs):
+    """
+    Packs each reading's quantized state into one int64 key.
+    """
+    values = dict(inputs)
+    values['log_bacteria'] = np.log10(np.maximum(np.asarray(inputs['bacteria_count'],
+                                                            dtype=np.float64), 1))
+    codes = {}
+    for field, (resolution, offset, bits) in QUANTIZATION.items():
+        raw = np.asarray(values.get(field, 0), dtype=np.float64)
+        codes[field] = np.rint(raw / resolution) + offset
+    for name, comparison, threshold in BREAKPOINTS:
+        field = 'log_bacteria' if name == 'bacteria_count' else name
+        edge = _first_code_past(field, comparison, threshold)
+        raw = np.asarray(inputs[name], dtype=np.float64)
+        past = raw > threshold if comparison == '>' else raw >= threshold
+        codes[field] = np.where(past, np.maximum(codes[field], edge),
+                                np.minimum(codes[field], edge - 1))
+
+    n = len(np.asarray(inputs['temperature']))
+    key = np.zeros(n, dtype=np.int64)
+    for field, (resolution, offset, bits) in QUANTIZATION.items():
+        code = np.clip(codes[field], 0, (1 << bits) - 1).astype(np.int64)
+        key = (key << bits) | code
+    return key
+
+
+def dequantize(keys):
+    """
+    Representative inputs (the bucket centres) for packed keys.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    fields = {}
+    for field, (resolution, offset, bits) in reversed(QUANTIZATION.items()):
+        fields[field] = _centre(field, keys & ((1 << bits) - 1))
+        keys = keys >> bits
+    inputs = {name: fields[name] for name in INPUTS if name in fields}
+    inputs['bacteria_count'] = fields['log_bacteria']
+    inputs['milk_type'] = fields['milk_type'].astype(np.int64)
+    return inputs
+
+
+class PredictionCache:
+    """
+    LRU (+ optional TTL) cache in front of a vectorized scorer.
+
+    score() quantizes a batch, looks up each distinct key once, scores all
+    misses in a single scorer call on the bucket centres and scatters the
+    results back to the batch order. With bypass=True every call goes
+    straight to the scorer on the raw inputs.
+
+    Scores come from the bucket centre, not the raw reading: with the edge
+    model that moves shelf life by well under 1h. Buckets are split at
+    BREAKPOINTS, so risk flags and step penalties match the raw reading.
+    """
+
+    def __init__(self, maxsize=100_000, ttl_seconds=None, scorer=default_scorer, bypass=False,
+                 clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.scorer = scorer
+        self.bypass = bypass
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, tuple of outputs)
+        self._fields = None
+        self._dtypes = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypassed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'bypassed': self.bypassed,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def _learn_fields(self, scored):
+        self._fields = list(scored)
+        self._dtypes = [np.asarray(scored[f]).dtype for f in self._fields]
+
+    @instrumentation.timed('PredictionCache.score',
+                           rows=lambda result: len(next(iter(result.values()))))
+    def score(self, inputs):
+        """
+        Scores a dict (or DataFrame) of INPUTS columns; returns the scorer's
+        dict of output arrays in input order.
+        """
+        if self.bypass:
+            self.bypassed += len(np.asarray(inputs['temperature']))
+            return self.scorer(inputs)
+
+        keys = quantize(inputs)
+        if len(keys) == 0:
+            if self._fields is None:
+                # Learn the scorer's output columns from one throwaway row
+                self._learn_fields(self.scorer(dequantize(np.zeros(1, dtype=np.int64))))
+            return {f: np.empty(0, dtype=dtype) for f, dtype in zip(self._fields, self._dtypes)}
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        now = self.clock()
+        rows = [None] * len(unique_keys)
+        missing = []
+        entries = self._entries
+        for i, key in enumerate(unique_keys.tolist()):
+            entry = entries.get(key)
+            if entry is not None and self.ttl_seconds is not None and entry[0] <= now:
+                del entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                missing.append(i)
+            else:
+                entries.move_to_end(key)
+                rows[i] = entry[1]
+        self.hits += len(unique_keys) - len(missing)
+        self.misses += len(missing)
+        instrumentation.count('prediction_cache_hits', len(unique_keys) - len(missing))
+        instrumentation.count('prediction_cache_misses', len(missing))
+        if instrumentation.enabled() and self.hits + self.misses:
+            instrumentation.gauge('prediction_cache_hit_rate',
+                                  self.hits / (self.hits + self.misses))
+
+        if missing:
+            scored = self.scorer(dequantize(unique_keys[missing]))
+            if self._fields is None:
+                self._learn_fields(scored)
+            expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else None
+            columns = [np.asarray(scored[f]).tolist() for f in self._fields]
+            for i, row in zip(missing, zip(*columns)):
+                rows[i] = row
+                entries[int(unique_keys[i])] = (expires_at, row)
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+        table = np.array(rows, dtype=np.float64).reshape(len(unique_keys), len(self._fields))
+        return {f: table[inverse, k].astype(dtype)
+                for k, (f, dtype) in enumerate(zip(self._fields, self._dtypes))}
+
+
+if __name__ == "__main__":
+    import generate_dataset as gd
+    import train_models
+
+    # A cold room: 1,000 batches over 100 ticks, readings at sensor resolution
+    rng = np.random.default_rng(0)
+    n = 100_000
+    milk_type = rng.integers(0, 3, n)
+    readings = {
+        'temperature': np.round(rng.normal(4, 0.2, n), 1),
+        'ph': np.round(rng.normal(6.7, 0.02, n), 2),
+        'bacteria_count': np.round(10 ** np.round(rng.normal(3.5, 0.1, n), 1)),
+        'humidity': np.round(rng.normal(65, 0.5, n), 1),
+        'fat_content': gd.FAT_MEAN[milk_type],
+        'milk_type': milk_type,
+    }
+    artifact, _ = train_models.load_or_train()
+    for name, scorer in (('edge model', default_scorer),
+                         ('trained ensemble', artifact_scorer(artifact))):
+        cache = PredictionCache(scorer=scorer)
+        for label in ('cold', 'warm'):
+            start = time.perf_counter()
+            cache.score(readings)
+            print(f"{name} {label}: {time.perf_counter() - start:.3f}s {cache.stats()}")
+        cache.bypass = True
+        start = time.perf_counter()
+        cache.score(readings)
+        print(f"{name} bypass: {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,199 @@
+"""
+Chart and table data for the PPTX reports, cached by content hash.
+
+Each chart kind turns a dataset (any generate_dataset format) or a
+sensor_data CSV export into a small JSON-serializable dict: categories,
+series and optional table rows, ready for resources/create_pptx.py to
+draw as a native chart. Results are stored under CHART_CACHE_DIR keyed
+by the SHA-256 of the source contents, the chart kind and its options, so
+a report rebuilt from unchanged data reads the cached dict instead of
+rescanning the source. The key also serves as the slide's fingerprint.
+"""
+
+import functools
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import generate_dataset as gd
+
+CHART_CACHE_DIR = ".chart_cache"
+# Bump when a chart function's output changes for the same inputs
+CHART_DATA_VERSION = 1
+
+
+def source_digest(path, block_size=1 << 20):
+    """
+    SHA-256 over a file, or over every file of a directory (npy datasets)
+    in name order.
+    """
+    path = os.path.abspath(path)
+    return _source_digest(path, _stat_key(path), block_size)
+
+
+def _stat_key(path):
+    # Re-hash only when a file changed size or mtime since the last call
+    paths = ([os.path.join(path, name) for name in sorted(os.listdir(path))]
+             if os.path.isdir(path) else [path])
+    return tuple((p, os.stat(p).st_size, os.stat(p).st_mtime_ns) for p in paths)
+
+
+@functools.lru_cache(maxsize=256)
+def _source_digest(path, stat_key, block_size):
+    h = hashlib.sha256()
+    for file_path, _, _ in stat_key:
+        if file_path != path:
+            h.update(os.path.basename(file_path).encode())
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def chart_key(kind, source, options=None):
+    h = hashlib.sha256()
+    h.update(f"{kind};v{CHART_DATA_VERSION};".encode())
+    h.update(source_digest(source).encode())
+    h.update(json.dumps(options or {}, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=8)
+def _analytics(path, digest):
+    import dataset_analytics
+
+    return dataset_analytics.analyze_dataset(path)
+
+
+@functools.lru_cache(maxsize=8)
+def _readings(path, digest):
+    import spc
+
+    return spc.load_readings(path)
+
+
+def quality_labels(source):
+    """
+    Sample count per Quality_Label.
+    """
+    groups = _analytics(source, source_digest(source)).group_summary('Quality_Label')
+    labels = list(reversed(gd.QUALITY_LABELS))
+    counts = [groups[label]['count'] for label in labels]
+    total = sum(counts) or 1
+    return {
+        'chart': 'column',
+        'categories': labels,
+        'series': [{'name': 'Samples', 'values': counts}],
+        'table': {'columns': ['Quality', 'Samples', 'Share'],
+                  'rows': [[label, f"{n:,}", f"{n / total:.1%}"]
+                           for label, n in zip(labels, counts)]},
+    }
+
+
+def shelf_life_histogram(source, merge_bins=4):
+    """
+    Shelf_Life_Hours histogram on the dataset_analytics bins, merge_bins
+    adjacent bins at a time.
+    """
+    analytics = _analytics(source, source_digest(source))
+    counts = analytics.histograms['Shelf_Life_Hours'][1:-1]
+    edges = analytics.histogram_edges('Shelf_Life_Hours')
+    bins = len(counts) // merge_bins
+    counts = counts[:bins * merge_bins].reshape(bins, merge_bins).sum(axis=1)
+    edges = edges[::merge_bins]
+    return {
+        'chart': 'column',
+        'categories': [f"{lo:.0f}-{hi:.0f}h" for lo, hi in zip(edges[:-1], edges[1:])],
+        'series': [{'name': 'Batches', 'values': counts.tolist()}],
+    }
+
+
+def control_chart(source, parameter='ph', subgroup_size=5, max_points=50):
+    """
+    X-bar chart of the last max_points subgroups with its control limits.
+    """
+    import spc
+
+    readings = _readings(source, source_digest(source))
+    chart = spc.xbar_r_chart(readings[parameter], subgroup_size)
+    means = chart['means'][-max_points:]
+    start = len(chart['means']) - len(means)
+    n = len(means)
+    return {
+        'chart': 'line',
+        'categories': [str(start + i + 1) for i in range(n)],
+        'series': [
+            {'name': f"{parameter} subgroup mean", 'values': np.round(means, 4).tolist()},
+            {'name': 'UCL', 'values': [round(chart['ucl'], 4)] * n, 'role': 'limit'},
+            {'name': 'Center', 'values': [round(chart['center'], 4)] * n, 'role': 'center'},
+            {'name': 'LCL', 'values': [round(chart['lcl'], 4)] * n, 'role': 'limit'},
+        ],
+        'table': {'columns': ['Statistic', 'Value'],
+                  'rows': [['Center', f"{chart['center']:.3f}"],
+                           ['UCL', f"{chart['ucl']:.3f}"],
+                           ['LCL', f"{chart['lcl']:.3f}"],
+                           ['Sigma', f"{chart['sigma']:.4f}"],
+                           ['Out of control', f"{len(chart['out_of_control']):,}"]]},
+    }
+
+
+def risk_pareto(source):
+    """
+    Pareto of the edge-function risk factors, with cumulative shares.
+    """
+    import spc
+
+    chart = spc.risk_factor_pareto(_readings(source, source_digest(source)))
+    return {
+        'chart': 'bar',
+        'categories': [str(label) for label in chart['labels']],
+        'series': [{'name': 'Readings', 'values': chart['counts'].tolist()}],
+        'table': {'columns': ['Risk factor', 'Readings', 'Cumulative'],
+                  'rows': [[str(label), f"{int(n):,}", f"{cum:.1f}%"]
+                           for label, n, cum in zip(chart['labels'], chart['counts'],
+                                                    chart['cumulative'])]},
+    }
+
+
+def milk_type_summary(source):
+    """
+    Samples and average shelf life per milk type, as a table.
+    """
+    rows = _analytics(source, source_digest(source)).batch_comparison()
+    return {
+        'table': {'columns': ['Milk type', 'Samples', 'Avg shelf life (days)'],
+                  'rows': [[r['type'], f"{r['samples']:,}", f"{r['avgShelfLife']:.1f}"]
+                           for r in rows]},
+    }
+
+
+CHART_KINDS = {
+    'quality_labels': quality_labels,
+    'shelf_life_histogram': shelf_life_histogram,
+    'control_chart': control_chart,
+    'risk_pareto': risk_pareto,
+    'milk_type_summary': milk_type_summary,
+}
+
+
+def chart_data(kind, source, options=None, cache_dir=CHART_CACHE_DIR):
+    """
+    (key, data, cached) for one chart; data is computed only when no
+    cache entry exists for the current source contents and options.
+    """
+    if kind not in CHART_KINDS:
+        raise ValueError(f"Unknown chart kind {kind!r}; use one of {sorted(CHART_KINDS)}")
+    key = chart_key(kind, source, options)
+    path = os.path.join(cache_dir, f"{kind}_{key}.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            return key, json.load(f), True
+    data = CHART_KINDS[kind](source, **(options or {}))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+    return key, data, False
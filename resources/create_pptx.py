@@ -1,637 +1,563 @@
 #!/usr/bin/env python3
 """
-Convert DairyGuard presentation content to PPTX format
+Render DairyGuard decks to PPTX from a slide spec and the design tokens.
+
+Slides come from a JSON spec (dairyguard-ppt-slides.json by default) and
+all styling from dairyguard-ppt-design-tokens.json, which is parsed once
+per process. Body defaults are written once into the slide master and
+each text box carries a single list style, so no paragraph is styled by
+hand. Text in the spec may use ${plant}, ${report_date} and ${dataset};
+passing several --plant values renders one weekly deck per plant across
+a process pool.
+
+'chart' and 'table' slides draw native PPTX charts and tables from
+report_charts, whose data is cached by a content hash of the source.
+Each deck records a fingerprint of its slides, so re-running a report on
+unchanged data and specs leaves the file alone, and after a change only
+the charts whose data changed are recomputed.
+
+Usage:
+    python resources/create_pptx.py [-o DairyGuard-Business-Presentation.pptx]
+    python resources/create_pptx.py --plant "Plant A=plant_a.csv" --plant "Plant B=plant_b.csv" \
+        --output-dir reports
 """
 
+import argparse
+import datetime
+import functools
+import hashlib
+import json
 import os
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.enum.shapes import MSO_SHAPE
-
-def create_dairyguard_pptx():
-    # Create presentation object
+import re
+import string
+import sys
+import time
+
+RESOURCES_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(RESOURCES_DIR)
+sys.path.insert(0, ROOT)
+
+TOKENS_PATH = os.path.join(RESOURCES_DIR, 'dairyguard-ppt-design-tokens.json')
+SPEC_PATH = os.path.join(RESOURCES_DIR, 'dairyguard-ppt-slides.json')
+REPORT_SPEC_PATH = os.path.join(RESOURCES_DIR, 'dairyguard-weekly-report-slides.json')
+DEFAULT_DATASET = os.path.join(ROOT, 'milk_shelf_life_dataset.csv')
+DEFAULT_OUTPUT = 'DairyGuard-Business-Presentation.pptx'
+REPORT_FILENAME = 'DairyGuard-${plant_slug}-${report_date}.pptx'
+
+# The tokens are laid out for a 1280x720 px viewport; PowerPoint's 16:9
+# slide is 13.333 x 7.5 in, so 1 px = 1/96 in = 0.75 pt.
+EMU_PER_PX = 9525
+PT_PER_PX = 0.75
+
+DEFAULT_BODY_SIZE = 'bodySmall'
+
+# Series colors in order; control limits and center lines get their own
+SERIES_COLORS = ['accent.blue', 'accent.orange', 'accent.teal']
+ROLE_COLORS = {'limit': 'semantic.error', 'center': 'text.tertiary'}
+
+
+def _px(value):
+    return float(re.match(r'[\d.]+', value).group())
+
+
+def _first_font(stack):
+    return stack.split(',')[0].strip().strip("'\"")
+
+
+@functools.lru_cache(maxsize=None)
+def load_theme(tokens_path=TOKENS_PATH):
+    """
+    The design tokens resolved to plain values: colors as 'RRGGBB' hex,
+    font sizes in points, lengths in EMU. Cached per path, so a worker
+    rendering many decks parses the file once.
+    """
+    with open(tokens_path) as f:
+        tokens = json.load(f)
+    colors = {f"{group}.{name}": token['value'].lstrip('#').upper()
+              for group, entries in tokens['color'].items()
+              for name, token in entries.items()}
+    typography = tokens['typography']
+    return {
+        'colors': colors,
+        'font_sizes': {name: _px(token['value']) * PT_PER_PX
+                       for name, token in typography['fontSize'].items()},
+        'line_heights': {name: float(token['value'])
+                         for name, token in typography['lineHeight'].items()},
+        'heading_font': _first_font(typography['fontFamily']['heading']['value']),
+        'body_font': _first_font(typography['fontFamily']['body']['value']),
+        'spacing': {name: int(_px(token['value']) * EMU_PER_PX)
+                    for name, token in tokens['spacing'].items()},
+        'slide_width': int(_px(tokens['layout']['viewport']['width']['value']) * EMU_PER_PX),
+        'slide_height': int(_px(tokens['layout']['viewport']['height']['value']) * EMU_PER_PX),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def load_spec(spec_path=SPEC_PATH):
+    with open(spec_path) as f:
+        return json.load(f)
+
+
+def _default_run_properties(size_pt, color, font, bold=False):
+    # <a:defRPr> body shared by the master styles and per-shape list styles
+    return (f'sz="{int(round(size_pt * 100))}" b="{int(bold)}">'
+            f'<a:solidFill><a:srgbClr val="{color}"/></a:solidFill>'
+            f'<a:latin typeface="{font}"/><a:cs typeface="{font}"/>')
+
+
+def _set_list_style(text_frame, size_pt, color, font, bold=False, line_height=None):
+    """
+    Styles every paragraph of a text box through one <a:lstStyle> entry.
+    """
+    from pptx.oxml import parse_xml
+    from pptx.oxml.ns import nsdecls, qn
+
+    spacing = (f'<a:lnSpc><a:spcPct val="{int(line_height * 100000)}"/></a:lnSpc>'
+               if line_height else '')
+    lst_style = parse_xml(
+        f'<a:lstStyle {nsdecls("a")}><a:lvl1pPr>{spacing}'
+        f'<a:defRPr {_default_run_properties(size_pt, color, font, bold)}</a:defRPr>'
+        f'</a:lvl1pPr></a:lstStyle>')
+    body = text_frame._txBody
+    existing = body.find(qn('a:lstStyle'))
+    if existing is not None:
+        body.replace(existing, lst_style)
+    else:
+        body.find(qn('a:bodyPr')).addnext(lst_style)
+
+
+def _apply_master(prs, theme):
+    """
+    Slide size, background and default text style, set once per deck.
+    """
+    from pptx.dml.color import RGBColor
+    from pptx.oxml import parse_xml
+    from pptx.oxml.ns import nsdecls, qn
+
+    prs.slide_width = theme['slide_width']
+    prs.slide_height = theme['slide_height']
+    master = prs.slide_master
+    master.background.fill.solid()
+    master.background.fill.fore_color.rgb = RGBColor.from_string(
+        theme['colors']['background.primary'])
+    # Text boxes inherit otherStyle, so unstyled text still follows the tokens
+    run_properties = _default_run_properties(theme['font_sizes'][DEFAULT_BODY_SIZE],
+                                             theme['colors']['text.primary'], theme['body_font'])
+    other = master.element.find(qn('p:txStyles')).find(qn('p:otherStyle'))
+    other.getparent().replace(other, parse_xml(
+        f'<p:otherStyle {nsdecls("a", "p")}><a:lvl1pPr>'
+        f'<a:defRPr {run_properties}</a:defRPr></a:lvl1pPr></p:otherStyle>'))
+
+
+def _text_box(slide, left, top, width, height, lines, style, anchor=None, autofit=True):
+    from pptx.enum.text import MSO_ANCHOR, MSO_AUTO_SIZE
+
+    box = slide.shapes.add_textbox(left, top, width, height)
+    frame = box.text_frame
+    frame.word_wrap = True
+    frame.text = '\n'.join(lines)
+    if autofit:
+        # PowerPoint shrinks overflowing text on open
+        frame.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
+    if anchor:
+        frame.vertical_anchor = getattr(MSO_ANCHOR, anchor)
+    _set_list_style(frame, *style)
+    return box
+
+
+def _split_columns(lines, columns):
+    """
+    Splits body lines into columns, breaking at the blank line closest to
+    each even share so sections stay together.
+    """
+    if columns <= 1:
+        return [lines]
+    breaks = [i for i, line in enumerate(lines) if not line.strip()]
+    parts, start = [], 0
+    for k in range(1, columns):
+        target = len(lines) * k / columns
+        candidates = [i for i in breaks if i > start] or [int(target)]
+        cut = min(candidates, key=lambda i: abs(i - target))
+        parts.append(lines[start:cut])
+        start = cut + 1 if cut in breaks else cut
+    parts.append(lines[start:])
+    return parts
+
+
+def _render_title(slide, spec, theme, subst):
+    colors, sizes = theme['colors'], theme['font_sizes']
+    margin_x, margin_y = theme['spacing']['marginHorizontal'], theme['spacing']['marginVertical']
+    width = theme['slide_width'] - 2 * margin_x
+    middle = theme['slide_height'] // 2
+    _text_box(slide, margin_x, margin_y, width, middle - margin_y, [subst(spec['title'])],
+              (sizes['display'], colors['accent.blue'], theme['heading_font'], True,
+               theme['line_heights']['tight']), anchor='BOTTOM', autofit=False)
+    _text_box(slide, margin_x, middle + theme['spacing']['lg'], width,
+              middle - theme['spacing']['lg'] - margin_y,
+              [subst(line) for line in spec.get('subtitle', [])],
+              (sizes['bodyLarge'], colors['text.secondary'], theme['body_font'], False,
+               theme['line_heights']['normal']), anchor='TOP')
+
+
+def _render_heading(slide, title, theme):
+    """
+    Slide title with the accent rule under it; returns the content area
+    as (left, top, width, height).
+    """
+    from pptx.dml.color import RGBColor
+    from pptx.enum.shapes import MSO_SHAPE
+
+    colors, sizes, spacing = theme['colors'], theme['font_sizes'], theme['spacing']
+    margin_x, margin_y = spacing['marginHorizontal'], spacing['marginVertical']
+    width = theme['slide_width'] - 2 * margin_x
+    title_height = int(sizes['h2'] / PT_PER_PX * theme['line_heights']['snug'] * EMU_PER_PX)
+    _text_box(slide, margin_x, margin_y, width, title_height, [title],
+              (sizes['h2'], colors['accent.blue'], theme['heading_font'], True,
+               theme['line_heights']['snug']), anchor='BOTTOM')
+
+    rule = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, margin_x,
+                                  margin_y + title_height + spacing['sm'],
+                                  spacing['4xl'], spacing['xs'])
+    rule.fill.solid()
+    rule.fill.fore_color.rgb = RGBColor.from_string(colors['accent.blue'])
+    rule.line.fill.background()
+
+    top = margin_y + title_height + spacing['lg']
+    return margin_x, top, width, theme['slide_height'] - top - margin_y - spacing['lg']
+
+
+def _render_bullets(slide, spec, theme, subst):
+    colors, sizes, spacing = theme['colors'], theme['font_sizes'], theme['spacing']
+    margin_x, top, width, height = _render_heading(slide, subst(spec['title']), theme)
+    columns = _split_columns([subst(line) for line in spec.get('body', [])],
+                             spec.get('columns', 1))
+    gutter = spacing['gutter']
+    column_width = (width - gutter * (len(columns) - 1)) // len(columns)
+    style = (sizes[spec.get('size', DEFAULT_BODY_SIZE)], colors['text.primary'],
+             theme['body_font'], False, theme['line_heights']['normal'])
+    for k, lines in enumerate(columns):
+        _text_box(slide, margin_x + k * (column_width + gutter), top, column_width, height,
+                  lines, style)
+
+
+def _add_chart(slide, data, left, top, width, height, theme):
+    from pptx.chart.data import CategoryChartData
+    from pptx.dml.color import RGBColor
+    from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
+    from pptx.enum.dml import MSO_LINE_DASH_STYLE
+    from pptx.util import Pt
+
+    colors, sizes = theme['colors'], theme['font_sizes']
+    chart_data = CategoryChartData()
+    chart_data.categories = data['categories']
+    for series in data['series']:
+        chart_data.add_series(series['name'], series['values'])
+    chart_type = {'column': XL_CHART_TYPE.COLUMN_CLUSTERED, 'bar': XL_CHART_TYPE.BAR_CLUSTERED,
+                  'line': XL_CHART_TYPE.LINE}[data['chart']]
+    chart = slide.shapes.add_chart(chart_type, left, top, width, height, chart_data).chart
+
+    chart.font.size = Pt(sizes['label'])
+    chart.font.name = theme['body_font']
+    chart.font.color.rgb = RGBColor.from_string(colors['text.secondary'])
+    chart.has_legend = len(data['series']) > 1
+    if chart.has_legend:
+        chart.legend.position = XL_LEGEND_POSITION.BOTTOM
+        chart.legend.include_in_layout = False
+    value_axis = chart.value_axis
+    value_axis.major_gridlines.format.line.color.rgb = RGBColor.from_string(
+        colors['border.default'])
+    value_axis.format.line.fill.background()
+    chart.category_axis.format.line.color.rgb = RGBColor.from_string(colors['border.strong'])
+    if data['chart'] == 'bar':
+        # Largest category on top, as a Pareto reads
+        chart.category_axis.reverse_order = True
+
+    plot = chart.plots[0]
+    if data['chart'] in ('column', 'bar'):
+        plot.gap_width = 50
+    palette = iter(SERIES_COLORS * len(data['series']))
+    for series, spec in zip(plot.series, data['series']):
+        role = spec.get('role')
+        color = RGBColor.from_string(colors[ROLE_COLORS[role] if role else next(palette)])
+        if data['chart'] == 'line':
+            series.smooth = False
+            series.format.line.color.rgb = color
+            series.format.line.width = Pt(1.5 if role else 2.25)
+            if role:
+                series.marker.style = None
+                series.format.line.dash_style = (MSO_LINE_DASH_STYLE.DASH if role == 'limit'
+                                                 else MSO_LINE_DASH_STYLE.SOLID)
+        else:
+            series.format.fill.solid()
+            series.format.fill.fore_color.rgb = color
+    return chart
+
+
+def _add_table(slide, table_data, left, top, width, theme):
+    from pptx.dml.color import RGBColor
+
+    colors, sizes, spacing = theme['colors'], theme['font_sizes'], theme['spacing']
+    rows, columns = table_data['rows'], table_data['columns']
+    row_height = int(sizes['caption'] / PT_PER_PX * 2 * EMU_PER_PX)
+    shape = slide.shapes.add_table(len(rows) + 1, len(columns), left, top, width,
+                                   row_height * (len(rows) + 1))
+    table = shape.table
+    header_style = (sizes['caption'], colors['text.primary'], theme['body_font'], True)
+    body_style = (sizes['caption'], colors['text.secondary'], theme['body_font'])
+    for r, values in enumerate([columns] + rows):
+        fill = colors['background.tertiary' if r == 0 else 'background.secondary']
+        for c, value in enumerate(values):
+            cell = table.cell(r, c)
+            cell.text = str(value)
+            cell.fill.solid()
+            cell.fill.fore_color.rgb = RGBColor.from_string(fill)
+            cell.margin_left = cell.margin_right = spacing['sm']
+            _set_list_style(cell.text_frame, *(header_style if r == 0 else body_style))
+    return shape
+
+
+def _render_chart(slide, spec, theme, subst):
+    left, top, width, height = _render_heading(slide, subst(spec['title']), theme)
+    data = spec['data']
+    gutter = theme['spacing']['gutter']
+    caption_height = 0
+    if spec.get('caption'):
+        caption_height = theme['spacing']['2xl']
+        _text_box(slide, left, top + height - caption_height, width, caption_height,
+                  [subst(spec['caption'])],
+                  (theme['font_sizes']['caption'], theme['colors']['text.tertiary'],
+                   theme['body_font']), anchor='BOTTOM')
+    height -= caption_height
+    if 'categories' not in data:
+        _add_table(slide, data['table'], left, top, width, theme)
+        return
+    if 'table' in data:
+        chart_width = (width - gutter) * 2 // 3
+        _add_table(slide, data['table'], left + chart_width + gutter, top,
+                   width - chart_width - gutter, theme)
+    else:
+        chart_width = width
+    _add_chart(slide, data, left, top, chart_width, height, theme)
+
+
+SLIDE_RENDERERS = {
+    'title': _render_title,
+    'bullets': _render_bullets,
+    'chart': _render_chart,
+}
+
+
+def _render_footer(slide, text, number, theme):
+    from pptx.enum.text import PP_ALIGN
+
+    spacing, sizes, colors = theme['spacing'], theme['font_sizes'], theme['colors']
+    margin_x = spacing['marginHorizontal']
+    height = spacing['xl']
+    top = theme['slide_height'] - spacing['lg'] - height
+    width = theme['slide_width'] - 2 * margin_x
+    style = (sizes['label'], colors['text.tertiary'], theme['body_font'])
+    _text_box(slide, margin_x, top, width // 2, height, [text], style, autofit=False)
+    page = _text_box(slide, margin_x + width // 2, top, width - width // 2, height,
+                     [str(number)], style, autofit=False)
+    page.text_frame.paragraphs[0].alignment = PP_ALIGN.RIGHT
+
+
+def report_context(plant=None, report_date=None, dataset=None):
+    """
+    Substitution values for ${...} placeholders in a spec.
+    """
+    plant = plant or 'All plants'
+    report_date = report_date or datetime.date.today().isoformat()
+    return {
+        'plant': plant,
+        'plant_slug': re.sub(r'[^A-Za-z0-9]+', '-', plant).strip('-') or 'plant',
+        'report_date': report_date,
+        'dataset': dataset or DEFAULT_DATASET,
+    }
+
+
+def _deck_fingerprint(spec, subst, tokens_path):
+    """
+    Hash over the substituted slide specs, the chart data keys and the
+    tokens file: equal fingerprints render identical decks.
+    """
+    import report_charts
+
+    h = hashlib.sha256(report_charts.source_digest(tokens_path).encode())
+    h.update(subst(json.dumps({k: v for k, v in spec.items() if k != 'slides'},
+                              sort_keys=True)).encode())
+    keys = []
+    for slide_spec in spec['slides']:
+        key = None
+        if slide_spec.get('layout') == 'chart':
+            key = report_charts.chart_key(slide_spec['chart'], subst(slide_spec['source']),
+                                          slide_spec.get('options'))
+        keys.append(key)
+        h.update(subst(json.dumps(slide_spec, sort_keys=True)).encode())
+        h.update(str(key).encode())
+    return h.hexdigest()[:32], keys
+
+
+def _existing_fingerprint(path):
+    import zipfile
+
+    try:
+        with zipfile.ZipFile(path) as archive:
+            core = archive.read('docProps/core.xml').decode()
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+    match = re.search(r'<dc:identifier>([^<]*)</dc:identifier>', core)
+    return match.group(1) if match else None
+
+
+def render_deck(output_path, spec=None, context=None, tokens_path=TOKENS_PATH,
+                cache_dir=None, force=False):
+    """
+    Renders one deck. Returns a dict with the output path, the seconds
+    spent, whether the existing file was already up to date ('skipped')
+    and how many charts were computed versus read from the chart cache.
+
+    spec is a dict or a spec JSON path (default SPEC_PATH); context fills
+    its ${...} placeholders (see report_context).
+    """
+    from pptx import Presentation
+
+    start = time.perf_counter()
+    if spec is None or isinstance(spec, str):
+        spec = load_spec(spec or SPEC_PATH)
+    theme = load_theme(tokens_path)
+    context = context or report_context()
+
+    def subst(text):
+        return string.Template(text).safe_substitute(context)
+
+    fingerprint, _ = _deck_fingerprint(spec, subst, tokens_path)
+    result = {'path': output_path, 'skipped': False, 'charts_computed': 0, 'charts_cached': 0}
+    if not force and _existing_fingerprint(output_path) == fingerprint:
+        return dict(result, skipped=True, seconds=time.perf_counter() - start)
+
     prs = Presentation()
-    
-    # Define colors (Professional Blue #8BAFD0)
-    primary_color = RGBColor(139, 175, 208)  # #8BAFD0
-    bg_color = RGBColor(18, 18, 18)  # #121212 (dark background)
-    text_color = RGBColor(232, 232, 232)  # #E8E8E8 (light text)
-    
-    # Slide 1: Title Slide
-    slide = prs.slides.add_slide(prs.slide_layouts[0])  # Title slide layout
-    title = slide.shapes.title
-    subtitle = slide.placeholders[1]
-    
-    title.text = "DairyGuard"
-    title.text_frame.paragraphs[0].font.size = Pt(44)
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    subtitle.text = "Real-Time Milk Shelf Life Monitoring\n& Quality Analytics Platform"
-    for paragraph in subtitle.text_frame.paragraphs:
-        paragraph.font.size = Pt(18)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 2: Executive Summary
-    slide = prs.slides.add_slide(prs.slide_layouts[1])  # Title and content
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Executive Summary"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Value Proposition:
-• IoT & ML platform for milk shelf life prediction
-• Real-time monitoring of temperature, pH, bacteria, humidity
-• 6 user pages: Dashboard, Sensors, Prediction, QC Charts, Alerts, Analytics
-
-Problem Addressed:
-• $338B annual food waste crisis (2023)
-• 27% of food supply becomes waste
-• 80% of surplus comes from perishables
-
-Key Benefits:
-• Reduced spoilage and waste
-• Lower recall risk through real-time monitoring
-• Operational efficiency gains
-• Regulatory confidence through SPC-driven control"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 3: Industry Problems - Waste Statistics
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Industry Problem: Food Waste Crisis"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Key Statistics (2023):
-• Total food supply: 237 million tons
-• Unsold/uneaten share: 31% of supply
-• Food waste to disposal: 27% (≈63 million tons)
-• Economic value of waste: $338 billion
-• Perishables dominate: 80% of surplus
-
-Dairy Industry Impact:
-• Included in perishables category
-• Highly exposed to spoilage and temperature abuse
-• Cold chain variability increases risk
-• Date label confusion leads to premature discards
-
-Source: ReFED 2024/2025"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 4: Dairy Industry Challenges
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Four Critical Dairy Challenges"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """1. Spoilage and Waste
-   • Temperature excursions reduce shelf life
-   • Acidification trends go undetected
-   • Inventory rotation inefficiencies
-
-2. Process Inconsistency & Quality Defects
-   • Unstable processes produce defects
-   • Lack of statistical process control
-   • No real-time deviation alerts
-
-3. Safety/Regulatory Pressure
-   • FDA suspended milk quality testing program (2025)
-   • Increased reliance on in-house monitoring
-   • Compliance documentation gaps
-
-4. Cold Chain Fragility
-   • Distribution variability magnifies risk
-   • Limited visibility across supply chain
-   • Reactive rather than proactive management"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 5: Solution Overview
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "DairyGuard Solution Overview"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Integrated Technology Platform:
-
-IoT Sensor Integration
-• Real-time monitoring of 4 critical parameters
-• Temperature, pH, bacterial activity, humidity
-• Edge-to-cloud data transmission
-• Automated deviation alerts
-
-Machine Learning Predictions
-• 92% prediction accuracy
-• Confidence intervals for decision support
-• Shelf life forecasting with risk analysis
-• Real-time quality scoring
-
-Statistical Process Control
-• 7 SPC chart types for quality monitoring
-• Pareto, X-bar/R, Fishbone analysis
-• Process stability detection
-• Automated corrective action guidance
-
-6 User Interface Pages
-• Dashboard, Sensors, Prediction, QC Charts, Alerts, Analytics"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 6: Real-Time IoT Monitoring
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Real-Time IoT Monitoring"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Sensor Types & Capabilities:
-
-Temperature Monitoring
-• Range: -2°C to 8°C (refrigerated dairy range)
-• Precision: ±0.1°C accuracy
-• Real-time alerts for excursions
-
-pH Level Tracking
-• Range: 6.0 to 7.0 (dairy optimal range)
-• Detection of acidification trends
-• Early spoilage indicators
-
-Bacterial Activity Analysis
-• Real-time bacterial count monitoring
-• Subclinical detection capabilities
-• Contamination risk assessment
-
-Humidity Control
-• Optimal range: 85-95% for dairy storage
-• Mold and contamination prevention
-• Environmental stability monitoring
-
-Edge-to-Cloud Architecture
-• Continuous data transmission
-• Local processing capabilities
-• Secure data aggregation"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 7: ML Shelf Life Prediction
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "ML Shelf Life Prediction System"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Advanced Predictive Analytics:
-
-Core Capabilities
-• 92% prediction accuracy with confidence intervals
-• Real-time shelf life forecasting
-• Multi-parameter risk assessment
-• Confidence bounds for decision support
-
-Prediction Models
-• Temperature-time relationships
-• pH impact on shelf stability
-• Bacterial growth modeling
-• Environmental factor integration
-
-Decision Support Features
-• Risk scoring (Low/Medium/High)
-• Confidence intervals (± days)
-• Intervention recommendations
-• Inventory optimization guidance
-
-Business Impact
-• Earlier spoilage detection
-• Smarter inventory rotation
-• Reduced waste and recalls
-• Optimized production scheduling"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 8: Quality Control Charts
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Statistical Process Control (SPC) Charts"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """7 Quality Control Chart Types:
-
-1. Pareto Chart
-   • Prioritizes vital few defects
-   • 80/20 rule application
-   • Root cause prioritization
-
-2. X-bar/R Charts
-   • Process mean and range monitoring
-   • Statistical process control
-   • Out-of-control detection
-
-3. Fishbone Diagram
-   • Root cause analysis framework
-   • 6M methodology (Man, Machine, Method, Material, Mother Nature, Measurement)
-
-4. Histogram
-   • Distribution pattern analysis
-   • Process capability assessment
-   • Normal vs. abnormal patterns
-
-5. Scatter Plot
-   • Correlation analysis
-   • Variable relationship identification
-   • Trend line fitting
-
-6. P-Chart
-   • Proportion defect monitoring
-   • Statistical quality control
-   • Process stability tracking
-
-7. C-Chart
-   • Count-based defect monitoring
-   • Constant sample size analysis
-   • Quality trend identification"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(14)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 9: Application Features
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Application Features - 6 Core Pages"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Dashboard Page
-• Real-time KPIs and alerts overview
-• Critical temperature and pH monitoring
-• System health indicators
-
-Sensors Page
-• Live sensor data visualization
-• Individual sensor status monitoring
-• Historical data trends
-
-Prediction Page
-• ML shelf life predictions with confidence intervals
-• Risk scoring and intervention alerts
-• Batch-specific predictions
-
-QC Charts Page
-• Interactive SPC chart generation
-• Statistical analysis tools
-• Quality trend monitoring
-
-Alerts Page
-• Severity-based alert management
-• Automated notification system
-• Alert response tracking
-
-Analytics Page
-• Comprehensive data analysis
-• Performance metrics and trends
-• Predictive insights dashboard
-
-Add Product Page
-• New milk batch entry and tracking
-• Product-specific prediction models
-• Batch lifecycle management"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 10: Business Case & ROI
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Business Case & ROI"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Value Drivers:
-
-Cost Reduction
-• Reduced waste: 15-25% reduction in spoilage
-• Lower energy costs through optimized cooling
-• Reduced rework and quality issues
-
-Risk Mitigation
-• Recall prevention through early detection
-• Regulatory compliance confidence
-• Audit-ready documentation
-
-Operational Efficiency
-• Real-time monitoring reduces manual checks
-• Automated alerts improve response time
-• Data-driven decision making
-
-Revenue Protection
-• Consistent product quality
-• Extended shelf life management
-• Improved customer satisfaction
-
-ROI Projections
-• 62% first-year returns (industry average)
-• Payback period: 12-18 months
-• 3-year ROI: 150-250%"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 11: Implementation Roadmap
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Implementation Roadmap"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """4-Phase Deployment Plan:
-
-Phase 1: Foundation (Weeks 1-4)
-• Sensor installation and calibration
-• Network infrastructure setup
-• Initial data collection and baseline establishment
-
-Phase 2: System Integration (Weeks 5-8)
-• ML model training with facility data
-• User interface deployment
-• Staff training and onboarding
-
-Phase 3: Quality Control Setup (Weeks 9-12)
-• SPC chart configuration
-• Alert threshold optimization
-• Process validation and testing
-
-Phase 4: Full Production (Weeks 13-16)
-• Complete system activation
-• Performance monitoring
-• Continuous improvement optimization
-
-Ongoing Support
-• 24/7 system monitoring
-• Regular model retraining
-• Continuous improvement assessments"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 12: Competitive Advantages
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Competitive Advantages"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """5 Key Differentiators:
-
-1. Integrated IoT + ML Approach
-   • Real-time monitoring combined with predictive analytics
-   • Single platform solution vs. fragmented tools
-
-2. Dairy-Specific Intelligence
-   • Purpose-built for dairy industry challenges
-   • Optimized for milk shelf life prediction
-
-3. Advanced SPC Implementation
-   • 7 comprehensive quality control charts
-   • Statistical process control expertise
-
-4. Confidence Interval Predictions
-   • 92% accuracy with uncertainty quantification
-   • Risk-based decision support
-
-5. Real-Time Intervention Capabilities
-   • Immediate alert system
-   • Automated corrective action guidance
-   • Proactive rather than reactive management"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 13: Security & Governance
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Security & Governance"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Comprehensive Security Framework:
-
-Data Protection
-• End-to-end encryption for all data transmission
-• Secure cloud storage with redundancy
-• Regular security audits and compliance checks
-
-Authentication & Access Control
-• Multi-factor authentication (MFA)
-• Role-based access controls (RBAC)
-• Audit trail for all system interactions
-
-Regulatory Compliance
-• FDA 21 CFR Part 11 compliance ready
-• HACCP integration capabilities
-• GFSI benchmark alignment
-
-Data Governance
-• Data retention policies
-• Backup and disaster recovery
-• Incident response procedures
-
-Privacy Protection
-• GDPR compliance framework
-• Data anonymization capabilities
-• User consent management"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 14: Technology Architecture
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Technology Architecture"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """IoT Edge to Application Layer:
-
-IoT Sensor Layer
-• Temperature, pH, bacteria, humidity sensors
-• Edge computing capabilities
-• Local data processing and buffering
-
-Communication Layer
-• Secure IoT protocols (MQTT, CoAP)
-• Edge-to-cloud connectivity
-• Redundant communication paths
-
-Cloud Processing Layer
-• Real-time data ingestion
-• ML model inference and training
-• Historical data storage and analysis
-
-Application Layer
-• Web-based user interface
-• Mobile-responsive design
-• API integration capabilities
-
-Data Storage
-• Time-series database for sensor data
-• ML model artifact storage
-• User and configuration management"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 15: Future Roadmap
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Future Roadmap"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Short-term Enhancements (6 months):
-• Advanced analytics dashboard
-• Mobile application development
-• Integration with existing ERP systems
-
-Medium-term Developments (12 months):
-• AI-driven anomaly detection
-• Predictive maintenance features
-• Supply chain visibility integration
-• Multi-location management capabilities
-
-Long-term Vision (24 months):
-• Blockchain-based traceability
-• Advanced ML models with federated learning
-• Industry-wide benchmarking platform
-• Regulatory compliance automation
-
-Strategic Partnerships
-• Dairy equipment manufacturers
-• Quality assurance organizations
-• Research institutions for continuous innovation"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 16: Success Metrics & KPIs
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Success Metrics & KPIs"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Measurable Outcomes:
-
-Operational Metrics
-• Waste reduction: 15-25% target
-• Spoilage incidents: 50% reduction
-• Response time to alerts: <15 minutes
-• System uptime: 99.9% availability
-
-Quality Metrics
-• Prediction accuracy: 92% target
-• Shelf life extension: 10-15% average
-• Process stability improvement: 30%
-• Customer complaints: 40% reduction
-
-Financial Metrics
-• ROI achievement: 62% first-year
-• Cost per unit reduction: 8-12%
-• Energy savings: 5-10%
-• Labor efficiency: 15-20% improvement
-
-Compliance Metrics
-• Audit readiness: 95% score
-• Documentation completeness: 100%
-• Regulatory compliance: Zero violations
-• Traceability: Complete batch tracking"""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Slide 17: Call to Action
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    title = slide.shapes.title
-    content = slide.placeholders[1]
-    
-    title.text = "Next Steps & Call to Action"
-    title.text_frame.paragraphs[0].font.color.rgb = primary_color
-    
-    content.text = """Ready to Transform Your Dairy Operations?
-
-Immediate Opportunities:
-• Pilot program deployment (6-8 weeks)
-• Proof of concept implementation
-• ROI validation study
-
-Partnership Options:
-• Technology licensing agreement
-• Joint development partnership
-• White-label solution for equipment manufacturers
-
-Contact Information:
-• Demo scheduling and technical consultation
-• Custom solution design and scoping
-• Implementation timeline and cost planning
-
-Value Demonstration:
-• Industry benchmark analysis
-• Waste reduction potential assessment
-• Financial impact projection
-
-Let's discuss how DairyGuard can solve your specific dairy quality challenges and drive measurable business results."""
-    
-    for paragraph in content.text_frame.paragraphs:
-        paragraph.font.size = Pt(16)
-        paragraph.font.color.rgb = text_color
-    
-    # Save the presentation
-    output_path = "/workspace/DairyGuard-Business-Presentation.pptx"
-    prs.save(output_path)
-    print(f"PPTX presentation saved to: {output_path}")
-    
+    _apply_master(prs, theme)
+    blank = prs.slide_layouts[6]
+    footer = subst(spec['footer']) if spec.get('footer') else None
+    for number, slide_spec in enumerate(spec['slides'], start=1):
+        layout = slide_spec.get('layout', 'bullets')
+        if layout not in SLIDE_RENDERERS:
+            raise ValueError(f"Unknown slide layout {layout!r} on slide {number}")
+        if layout == 'chart':
+            import report_charts
+
+            _, data, cached = report_charts.chart_data(
+                slide_spec['chart'], subst(slide_spec['source']), slide_spec.get('options'),
+                cache_dir or report_charts.CHART_CACHE_DIR)
+            result['charts_cached' if cached else 'charts_computed'] += 1
+            slide_spec = dict(slide_spec, data=data)
+        slide = prs.slides.add_slide(blank)
+        SLIDE_RENDERERS[layout](slide, slide_spec, theme, subst)
+        if footer and layout != 'title':
+            _render_footer(slide, footer, number, theme)
+    prs.core_properties.title = subst(spec.get('name', ''))
+    prs.core_properties.identifier = fingerprint
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    prs.save(tmp_path)
+    os.replace(tmp_path, output_path)
+    return dict(result, seconds=time.perf_counter() - start)
+
+
+def _render_task(args):
+    path, spec, context, tokens_path, cache_dir, force = args
+    return render_deck(path, spec, context, tokens_path, cache_dir, force)
+
+
+def render_reports(plants, output_dir, spec_path=REPORT_SPEC_PATH, report_date=None,
+                   tokens_path=TOKENS_PATH, workers=None, filename=REPORT_FILENAME,
+                   datasets=None, cache_dir=None, force=False):
+    """
+    Renders one deck per plant across a process pool; returns the
+    render_deck results in plant order, each with its 'plant'.
+
+    datasets maps plant names to their data source (default DEFAULT_DATASET).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    datasets = datasets or {}
+    tasks = []
+    for plant in plants:
+        context = report_context(plant, report_date, datasets.get(plant))
+        path = os.path.join(output_dir, string.Template(filename).safe_substitute(context))
+        tasks.append((path, spec_path, context, tokens_path, cache_dir, force))
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        results = [_render_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_task, tasks))
+    return [dict(result, plant=plant) for plant, result in zip(plants, results)]
+
+
+def create_dairyguard_pptx(output_path=DEFAULT_OUTPUT):
+    """
+    The business presentation from the default spec.
+    """
+    result = render_deck(output_path, force=True)
+    print(f"PPTX presentation saved to: {output_path} ({result['seconds']:.2f}s)")
     return output_path
 
+
+def _describe(result):
+    if result['skipped']:
+        return f"{result['path']} up to date ({result['seconds']:.2f}s)"
+    return (f"{result['path']} ({result['seconds']:.2f}s, {result['charts_computed']} charts "
+            f"computed, {result['charts_cached']} cached)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render DairyGuard PPTX decks from a slide spec.")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f"output path for a single deck (default {DEFAULT_OUTPUT})")
+    parser.add_argument('--spec', help="slide spec JSON (default: the business deck, or the "
+                                         "weekly report when --plant is given)")
+    parser.add_argument('--tokens', default=TOKENS_PATH, help="design tokens JSON")
+    parser.add_argument('--dataset', help="data source for chart slides of a single deck")
+    parser.add_argument('--plant', action='append', default=[],
+                        help="NAME or NAME=DATASET: render a weekly report for this plant; "
+                             "repeatable")
+    parser.add_argument('--report-date', help="date shown in reports (default today)")
+    parser.add_argument('--output-dir', default='.', help="directory for per-plant reports")
+    parser.add_argument('-j', '--workers', type=int, default=0,
+                        help="worker processes for per-plant reports (default one per CPU)")
+    parser.add_argument('--cache-dir', help="chart data cache (default .chart_cache)")
+    parser.add_argument('--force', action='store_true',
+                        help="rewrite decks even when their fingerprint is unchanged")
+    args = parser.parse_args(argv)
+
+    if not args.plant:
+        result = render_deck(args.output, args.spec or SPEC_PATH,
+                             report_context(report_date=args.report_date, dataset=args.dataset),
+                             args.tokens, args.cache_dir, args.force)
+        print(f"PPTX presentation: {_describe(result)}")
+        return 0
+
+    plants, datasets = [], {}
+    for entry in args.plant:
+        name, _, dataset = entry.partition('=')
+        plants.append(name)
+        if dataset:
+            datasets[name] = dataset
+    start = time.perf_counter()
+    results = render_reports(plants, args.output_dir, args.spec or REPORT_SPEC_PATH,
+                             args.report_date, args.tokens, args.workers or None,
+                             datasets=datasets, cache_dir=args.cache_dir, force=args.force)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        print(f"{result['plant']}: {_describe(result)}")
+    print(f"Rendered {len(results)} decks in {elapsed:.2f}s "
+          f"({sum(r['seconds'] for r in results) / len(results):.2f}s per deck)")
+    return 0
+
+
 if __name__ == "__main__":
-    create_dairyguard_pptx()
\ No newline at end of file
+    raise SystemExit(main())
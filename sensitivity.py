@@ -0,0 +1,376 @@
+"""
+What-if sensitivity analysis of shelf life for a set of batches.
+
+sweep() replaces some of each batch's inputs (temperature, pH, initial
+CFU, fat) with every combination of the given sweep values and scores the
+full grid of outcomes: one shelf-life value per batch and grid point,
+e.g. "every batch in this cold room at 2, 3, ... 10°C". Inputs that are
+not swept keep the batch's own readings. The grid is evaluated by
+broadcasting batch columns against blocks of grid points, sized so the
+temporaries stay within memory_budget bytes, so sweeps of 10^8 points run
+in bounded memory; the full grid can be kept in memory, memory-mapped to
+an .npy file or reduced on the fly to per-point mean, min and max.
+
+partial_derivatives() gives each batch's local sensitivities by central
+differences, and sobol_indices() the first-order and total Sobol indices
+of the swept ranges plus the batch's own readings (Saltelli/Jansen
+estimators).
+
+Two models are available: 'dataset' is generate_dataset.shelf_life_hours,
+which has no fat term, and 'edge' is the edge-function penalty model of
+shelf_life_model at its expected base shelf life.
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+import generate_dataset as gd
+import instrumentation
+import shelf_life_model as slm
+
+# Swept inputs; bacteria_count is in CFU/ml, derivatives are per log10 CFU
+PARAMETERS = ['temperature', 'ph', 'bacteria_count', 'fat_content']
+BATCH_INPUTS = PARAMETERS + ['humidity']
+
+DERIVATIVE_STEPS = {
+    'temperature': 0.1,      # °C
+    'ph': 0.01,
+    'bacteria_count': 0.01,  # log10 CFU
+    'fat_content': 0.01,     # %
+}
+
+# Bytes of temporaries per grid point while scoring a block, including
+# the per-point sum/min/max; the edge model peaks at ~56 (measured with
+# tracemalloc). Blocks broadcast the sweep values, so nothing else scales
+# with the block.
+BYTES_PER_POINT = 64
+DEFAULT_MEMORY_BUDGET = 256 << 20
+DEFAULT_SOBOL_SAMPLES = 100_000
+
+
+def _dataset_model(temperature, ph, bacteria_count, fat_content, humidity):
+    return gd.shelf_life_hours(temperature, ph, bacteria_count)
+
+
+def _edge_model(temperature, ph, bacteria_count, fat_content, humidity):
+    return slm.predict_shelf_life(temperature, ph, bacteria_count, humidity, fat_content,
+                                  base_hours=slm.MEAN_BASE_HOURS)['shelf_life_hours']
+
+
+MODELS = {
+    'dataset': _dataset_model,
+    'edge': _edge_model,
+}
+
+
+def load_batches(path, fmt=None, limit=None):
+    """
+    Batch inputs from a dataset file, keyed by BATCH_INPUTS.
+    """
+    columns = gd.load_columns(path, fmt, list(slm.DATASET_INPUTS.values()))
+    return {arg: np.asarray(columns[col][:limit], dtype=np.float64)
+            for arg, col in slm.DATASET_INPUTS.items()}
+
+
+def _model(model):
+    if callable(model):
+        return model
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}; use one of {sorted(MODELS)}")
+    return MODELS[model]
+
+
+def _check_sweeps(sweeps):
+    unknown = set(sweeps) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Cannot sweep {sorted(unknown)}; use any of {PARAMETERS}")
+    return {p: np.atleast_1d(np.asarray(values, dtype=np.float64)) for p, values in sweeps.items()}
+
+
+def evaluate(batches, model='dataset', **overrides):
+    """
+    Shelf life of every batch with some inputs replaced, broadcasting
+    overrides against the batch columns.
+    """
+    inputs = {name: np.asarray(batches[name], dtype=np.float64) for name in BATCH_INPUTS}
+    inputs.update(overrides)
+    hours = _model(model)(**inputs)
+    return np.broadcast_to(hours, np.broadcast_shapes(*(np.shape(v) for v in inputs.values())))
+
+
+def _block_sizes(num_batches, num_points, memory_budget):
+    """
+    (batches, grid points) per block so one block fits memory_budget.
+    """
+    points = max(1, memory_budget // BYTES_PER_POINT)
+    if num_points <= points:
+        return max(1, min(num_batches, points // num_points)), num_points
+    return 1, points
+
+
+def _point_blocks(sweeps, names, shape, point_block):
+    """
+    Yields (p0, p1, block_shape, swept) for consecutive runs of at most
+    point_block flat grid points. Each run is a box of the grid: one value
+    of the leading axes, a slice of one axis and the whole of the trailing
+    ones, so swept holds scalars, slices and reshaped views of the sweep
+    values that broadcast to block_shape without gathering.
+    """
+    # Axes k: fit whole in a block; axis k - 1, if any, is sliced
+    k, inner = len(shape), 1
+    while k > 0 and inner * shape[k - 1] <= point_block:
+        k -= 1
+        inner *= shape[k]
+    trailing = {p: sweeps[p].reshape([-1 if a == axis else 1 for a in range(k - 1, len(shape))])
+                for axis, p in enumerate(names) if axis >= k}
+    if k == 0:
+        yield 0, inner, shape, {p: v[0] for p, v in trailing.items()}
+        return
+    sliced, chunk = names[k - 1], max(1, point_block // inner)
+    for outer in np.ndindex(*shape[:k - 1]):
+        swept = {p: sweeps[p][i] for p, i in zip(names, outer)}
+        swept.update(trailing)
+        base = (np.ravel_multi_index(outer, shape[:k - 1]) if outer else 0) * shape[k - 1]
+        for a0 in range(0, shape[k - 1], chunk):
+            a1 = min(a0 + chunk, shape[k - 1])
+            swept[sliced] = sweeps[sliced][a0:a1].reshape((-1,) + (1,) * (len(shape) - k))
+            yield (base + a0) * inner, (base + a1) * inner, (a1 - a0,) + shape[k:], swept
+
+
+def _open_grid(out, shape):
+    if out is None:
+        return np.empty(shape, dtype=np.float32)
+    if isinstance(out, str):
+        return np.lib.format.open_memmap(out, mode='w+', dtype=np.float32, shape=shape)
+    return out
+
+
+@instrumentation.timed(rows=lambda result: result['points'])
+def sweep(batches, sweeps, model='dataset', memory_budget=DEFAULT_MEMORY_BUDGET, out=None,
+          keep_grid=True):
+    """
+    Scores every batch at every combination of the sweep values.
+
+    sweeps maps parameters to the values to try, in order; the grid has
+    shape (batches, *sweep lengths). It is returned as float32 under
+    'grid': in memory, in out (an array or an .npy path, memory-mapped),
+    or not at all with keep_grid=False. The result also has per-point
+    'mean', 'min' and 'max' over batches, the 'gradient' of the mean along
+    each swept axis (hours per unit, per log10 CFU for bacteria_count, as
+    in partial_derivatives) and each batch's 'baseline' at its own
+    readings.
+    """
+    start = time.perf_counter()
+    sweeps = _check_sweeps(sweeps)
+    model = _model(model)
+    names = list(sweeps)
+    shape = tuple(len(sweeps[p]) for p in names)
+    num_points = math.prod(shape)
+    inputs = {name: np.asarray(batches[name], dtype=np.float64) for name in BATCH_INPUTS}
+    num_batches = len(inputs['temperature'])
+
+    grid = _open_grid(out, (num_batches,) + shape) if keep_grid else None
+    flat_grid = grid.reshape(num_batches, num_points) if keep_grid else None
+    total = np.zeros(num_points)
+    low = np.full(num_points, np.inf)
+    high = np.full(num_points, -np.inf)
+
+    batch_block, point_block = _block_sizes(num_batches, num_points, memory_budget)
+    for p0, p1, block_shape, swept in _point_blocks(sweeps, names, shape, point_block):
+        columns = (-1,) + (1,) * len(block_shape)
+        for b0 in range(0, num_batches, batch_block):
+            b1 = min(b0 + batch_block, num_batches)
+            block = {name: values[b0:b1].reshape(columns) for name, values in inputs.items()}
+            block.update({p: v[np.newaxis] for p, v in swept.items()})
+            hours = np.broadcast_to(model(**block), (b1 - b0,) + block_shape)
+            hours = hours.reshape(b1 - b0, p1 - p0)
+            total[p0:p1] += hours.sum(axis=0)
+            np.minimum(low[p0:p1], hours.min(axis=0), out=low[p0:p1])
+            np.maximum(high[p0:p1], hours.max(axis=0), out=high[p0:p1])
+            if keep_grid:
+                flat_grid[b0:b1, p0:p1] = hours
+
+    mean = (total / max(num_batches, 1)).reshape(shape)
+    gradient = {}
+    for axis, p in enumerate(names):
+        if shape[axis] > 1:
+            x = np.log10(np.maximum(sweeps[p], 1)) if p == 'bacteria_count' else sweeps[p]
+            gradient[p] = np.gradient(mean, x, axis=axis)
+    if isinstance(grid, np.memmap):
+        grid.flush()
+    return {
+        'parameters': names,
+        'values': [sweeps[p] for p in names],
+        'shape': (num_batches,) + shape,
+        'points': num_batches * num_points,
+        'grid': grid,
+        'mean': mean,
+        'min': low.reshape(shape),
+        'max': high.reshape(shape),
+        'gradient': gradient,
+        'baseline': evaluate(inputs, model).copy(),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def marginal_means(result):
+    """
+    Mean shelf life at each value of each swept parameter, averaged over
+    the batches and the other swept parameters.
+    """
+    mean = result['mean']
+    return {p: mean.mean(axis=tuple(a for a in range(mean.ndim) if a != axis))
+            for axis, p in enumerate(result['parameters'])}
+
+
+def partial_derivatives(batches, model='dataset', parameters=PARAMETERS, steps=None):
+    """
+    Central-difference derivative of each batch's shelf life, in hours per
+    unit (per log10 CFU for bacteria_count), keyed by parameter.
+
+    The dataset model is piecewise constant in pH and CFU, so those
+    derivatives are zero except within a step of a breakpoint.
+    """
+    steps = {**DERIVATIVE_STEPS, **(steps or {})}
+    inputs = {name: np.asarray(batches[name], dtype=np.float64) for name in BATCH_INPUTS}
+    derivatives = {}
+    for p in parameters:
+        h = steps[p]
+        x = inputs[p]
+        if p == 'bacteria_count':
+            log_x = np.log10(np.maximum(x, 1))
+            up, down = 10 ** (log_x + h), 10 ** (log_x - h)
+        else:
+            up, down = x + h, x - h
+        derivatives[p] = (evaluate(inputs, model, **{p: up})
+                          - evaluate(inputs, model, **{p: down})) / (2 * h)
+    return derivatives
+
+
+def _sample_factor(p, low, high, u):
+    if p == 'bacteria_count':
+        # CFU spans orders of magnitude: sample uniformly in log10
+        return 10 ** (np.log10(low) + u * (np.log10(high) - np.log10(low)))
+    return low + u * (high - low)
+
+
+@instrumentation.timed()
+def sobol_indices(batches, ranges, model='dataset', num_samples=DEFAULT_SOBOL_SAMPLES,
+                  rng=None, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    First-order and total Sobol indices of shelf life.
+
+    ranges maps swept parameters to (low, high), sampled uniformly (log10
+    uniform for bacteria_count). The remaining inputs come from a randomly
+    drawn batch, which is itself a factor named 'batch'. Uses
+    num_samples * (factors + 2) model evaluations in memory-bounded chunks.
+    """
+    _check_sweeps(ranges)
+    model = _model(model)
+    rng = np.random.default_rng(rng)
+    inputs = {name: np.asarray(batches[name], dtype=np.float64) for name in BATCH_INPUTS}
+    num_batches = len(inputs['temperature'])
+    factors = list(ranges) + ['batch']
+    d = len(factors)
+
+    # Running sums for the estimators, accumulated chunk by chunk
+    n = 0
+    sum_y = sum_y2 = 0.0
+    first = np.zeros(d)
+    total = np.zeros(d)
+    chunk = max(1, memory_budget // (BYTES_PER_POINT * (d + 2)))
+    while n < num_samples:
+        k = min(chunk, num_samples - n)
+        a = {p: _sample_factor(p, *ranges[p], rng.random(k)) for p in ranges}
+        b = {p: _sample_factor(p, *ranges[p], rng.random(k)) for p in ranges}
+        a['batch'] = rng.integers(0, num_batches, k)
+        b['batch'] = rng.integers(0, num_batches, k)
+
+        def score(sample):
+            args = {name: values[sample['batch']] for name, values in inputs.items()}
+            args.update({p: sample[p] for p in ranges})
+            return np.broadcast_to(model(**args), (k,))
+
+        y_a, y_b = score(a), score(b)
+        sum_y += y_a.sum() + y_b.sum()
+        sum_y2 += np.dot(y_a, y_a) + np.dot(y_b, y_b)
+        for i, factor in enumerate(factors):
+            y_ab = score({**a, factor: b[factor]})
+            first[i] += np.dot(y_b, y_ab - y_a)       # Saltelli 2010
+            total[i] += np.dot(y_a - y_ab, y_a - y_ab) / 2  # Jansen 1999
+        n += k
+
+    variance = sum_y2 / (2 * n) - (sum_y / (2 * n)) ** 2
+    scale = n * variance if variance > 0 else np.inf
+    return {
+        'factors': factors,
+        'first_order': dict(zip(factors, (first / scale).tolist())),
+        'total': dict(zip(factors, (total / scale).tolist())),
+        'variance': float(variance),
+        'evaluations': n * (d + 2),
+    }
+
+
+def parse_sweep(spec):
+    """
+    'temperature=2:10:9' (start:stop:count, inclusive) or 'ph=6.5,6.6,6.7'.
+    """
+    name, sep, values = spec.partition('=')
+    if not sep:
+        raise ValueError(f"Sweep {spec!r} must look like name=start:stop:count or name=v1,v2")
+    if ':' in values:
+        start, stop, count = values.split(':')
+        return name, np.linspace(float(start), float(stop), int(count))
+    return name, np.array([float(v) for v in values.split(',')])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="What-if shelf-life sensitivity analysis.")
+    parser.add_argument('--dataset', default='milk_shelf_life_dataset.csv',
+                        help="batches to analyse (any generate_dataset format)")
+    parser.add_argument('--limit', type=int, help="use only the first N batches")
+    parser.add_argument('--sweep', action='append', default=[],
+                        help="name=start:stop:count or name=v1,v2,...; repeatable "
+                             f"(names: {', '.join(PARAMETERS)})")
+    parser.add_argument('--model', choices=sorted(MODELS), default='dataset')
+    parser.add_argument('--memory-mb', type=float, default=DEFAULT_MEMORY_BUDGET / 2**20,
+                        help="memory budget for grid blocks")
+    parser.add_argument('-o', '--output', help="write the full grid to this .npy file")
+    parser.add_argument('--sobol', type=int, default=DEFAULT_SOBOL_SAMPLES,
+                        help="Sobol base samples over the swept ranges (0 to skip)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    batches = load_batches(args.dataset, limit=args.limit)
+    sweeps = dict(parse_sweep(spec) for spec in args.sweep) or {
+        'temperature': np.linspace(0, 12, 13)}
+    budget = int(args.memory_mb * 2**20)
+    result = sweep(batches, sweeps, args.model, budget, out=args.output,
+                   keep_grid=args.output is not None)
+    print(f"{result['points']:,} points {result['shape']} in {result['seconds']:.2f}s "
+          f"({result['points'] / result['seconds']:,.0f} points/s); "
+          f"baseline mean {result['baseline'].mean():.1f}h")
+    for p, means in marginal_means(result).items():
+        values = result['values'][result['parameters'].index(p)]
+        print(f"  {p}: " + ", ".join(f"{v:g} -> {m:.1f}h" for v, m in zip(values, means)))
+
+    print("Mean local sensitivity (hours per unit, CFU per log10):")
+    for p, derivative in partial_derivatives(batches, args.model).items():
+        print(f"  {p:<15}{derivative.mean():>10.2f}")
+
+    if args.sobol:
+        ranges = {p: (float(v.min()), float(v.max())) for p, v in sweeps.items()
+                  if v.min() < v.max()}
+        indices = sobol_indices(batches, ranges, args.model, args.sobol, args.seed, budget)
+        print(f"Sobol indices ({indices['evaluations']:,} evaluations):")
+        for factor in indices['factors']:
+            print(f"  {factor:<15}first {indices['first_order'][factor]:>6.3f}  "
+                  f"total {indices['total'][factor]:>6.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,277 @@
+"""
+Time-series sensor simulator for load testing the sensor_data pipeline.
+
+Evolves thousands of concurrent batches together: cold-room temperature
+with random excursions, Q10-driven bacterial growth (same Q10 and base
+shelf life as generate_dataset) and the pH decline that follows it. Each
+tick emits one sensor_data row per batch. Ticks are produced on asyncio
+and handed to file or SQLite (local Postgres stand-in) sinks through a
+bounded queue, paced to a target readings/sec.
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+import generate_dataset as gd
+import instrumentation
+import spc
+
+# Spoilage is reached at 10^7 CFU/ml; starting loads follow the dataset (10^3.5)
+SPOILAGE_LOG_CFU = 7.0
+INITIAL_LOG_CFU = 3.5
+# Growth rate at 4°C that reaches spoilage in BASE_SHELF_LIFE_HOURS
+REFERENCE_GROWTH_LOG_PER_HOUR = (SPOILAGE_LOG_CFU - INITIAL_LOG_CFU) / gd.BASE_SHELF_LIFE_HOURS
+# pH drop per log of growth above the starting load
+PH_DROP_PER_LOG = 0.12
+
+
+class SensorSimulator:
+    """
+    State of num_batches batches advanced one tick at a time.
+
+    Every tick moves the simulated clock by sim_seconds_per_tick and
+    returns a dict of sensor_data columns with one reading per batch.
+    Spoiled batches are retired and replaced by fresh ones, so the number
+    of concurrent batches stays constant.
+    """
+
+    def __init__(self, num_batches=1000, sim_seconds_per_tick=60, excursion_rate_per_hour=0.02,
+                 rng=None, start_time=None):
+        self.num_batches = num_batches
+        self.dt_hours = sim_seconds_per_tick / 3600
+        self.excursion_rate_per_hour = excursion_rate_per_hour
+        self.rng = np.random.default_rng(rng)
+        self.clock = np.datetime64(start_time or '2025-01-01T00:00:00', 'ms')
+        self.tick_delta = np.timedelta64(int(sim_seconds_per_tick * 1000), 'ms')
+        self.next_batch = 0
+
+        n = num_batches
+        self.batch_ids = np.empty(n, dtype=object)
+        self.setpoint = np.empty(n)
+        self.temperature = np.empty(n)
+        self.excursion_hours = np.zeros(n)
+        self.excursion_delta = np.zeros(n)
+        self.log_cfu = np.empty(n)
+        self.initial_log_cfu = np.empty(n)
+        self.initial_ph = np.empty(n)
+        self.humidity = np.empty(n)
+        self.age_hours = np.zeros(n)
+        self._start(np.arange(n))
+
+    def _start(self, idx):
+        """
+        (Re)initializes the batches at positions idx as fresh product.
+        """
+        k = len(idx)
+        if k == 0:
+            return
+        rng = self.rng
+        self.batch_ids[idx] = [f"BATCH-{i:07d}" for i in range(self.next_batch, self.next_batch + k)]
+        self.next_batch += k
+        self.setpoint[idx] = rng.normal(4, 0.5, k)
+        self.temperature[idx] = self.setpoint[idx]
+        self.excursion_hours[idx] = 0
+        self.excursion_delta[idx] = 0
+        self.log_cfu[idx] = rng.normal(INITIAL_LOG_CFU, 0.5, k)
+        self.initial_log_cfu[idx] = self.log_cfu[idx]
+        self.initial_ph[idx] = rng.normal(6.7, 0.05, k)
+        self.humidity[idx] = rng.normal(65, 5, k)
+        self.age_hours[idx] = 0
+
+    def tick(self):
+        rng = self.rng
+        n = self.num_batches
+        dt = self.dt_hours
+
+        # Temperature: excursions start at random and last 1-6 hours
+        starting = (self.excursion_hours <= 0) & (
+            rng.random(n) < self.excursion_rate_per_hour * dt)
+        k = np.count_nonzero(starting)
+        self.excursion_hours[starting] = rng.uniform(1, 6, k)
+        self.excursion_delta[starting] = rng.uniform(3, 10, k)
+        in_excursion = self.excursion_hours > 0
+        self.excursion_hours -= dt
+        target = self.setpoint + np.where(in_excursion, self.excursion_delta, 0)
+        # Thermal inertia: relax towards the target with a ~30 minute time constant
+        self.temperature += (target - self.temperature) * min(1.0, dt / 0.5)
+        self.temperature += rng.normal(0, 0.05, n)
+        np.clip(self.temperature, 0, 25, out=self.temperature)
+
+        # Q10-driven growth and the resulting acidification
+        rate = REFERENCE_GROWTH_LOG_PER_HOUR * gd.Q10 ** (
+            (self.temperature - gd.Q10_BASE_TEMP_C) / 10)
+        self.log_cfu += rate * dt
+        ph = (self.initial_ph - PH_DROP_PER_LOG * np.maximum(0, self.log_cfu - self.initial_log_cfu)
+              + rng.normal(0, 0.01, n))
+
+        self.humidity += rng.normal(0, 0.2, n)
+        np.clip(self.humidity, 30, 100, out=self.humidity)
+        self.age_hours += dt
+        self.clock = self.clock + self.tick_delta
+
+        reading = {
+            'batch_id': self.batch_ids.copy(),
+            'temperature': np.round(self.temperature, 2),
+            'ph': np.round(ph, 3),
+            'humidity': np.round(self.humidity, 1),
+            'storage_time': (self.age_hours * 60).astype(np.int32),  # minutes
+            'bacterial_risk': np.round(np.clip(
+                (self.log_cfu - 4) / (SPOILAGE_LOG_CFU - 4), 0, 1), 3),
+            'timestamp': np.full(n, self.clock),
+        }
+
+        self._start(np.flatnonzero(self.log_cfu >= SPOILAGE_LOG_CFU))
+        return reading
+
+
+class CsvSink:
+    """
+    Appends readings to a CSV file with the sensor_data columns.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', newline='')
+        self._header = True
+
+    def write(self, reading):
+        import pandas as pd
+
+        frame = pd.DataFrame(reading, columns=spc.SENSOR_DATA_COLUMNS)
+        # Vectorized ISO formatting; to_csv's date_format goes through strftime per row
+        frame['timestamp'] = np.datetime_as_string(reading['timestamp'], unit='ms', timezone='UTC')
+        frame.to_csv(self._file, index=False, header=self._header)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class SQLiteSink:
+    """
+    Local stand-in for Postgres: a sensor_data table with the columns of
+    sensor_schema.sql in a SQLite file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sensor_data ("
+            " id INTEGER PRIMARY KEY,"
+            " batch_id TEXT NOT NULL,"
+            " temperature REAL NOT NULL,"
+            " ph REAL NOT NULL,"
+            " humidity REAL NOT NULL,"
+            " storage_time INTEGER NOT NULL,"
+            " bacterial_risk REAL NOT NULL,"
+            " timestamp TEXT NOT NULL)")
+
+    def write(self, reading):
+        rows = zip(reading['batch_id'],
+                   reading['temperature'].tolist(),
+                   reading['ph'].tolist(),
+                   reading['humidity'].tolist(),
+                   reading['storage_time'].tolist(),
+                   reading['bacterial_risk'].tolist(),
+                   np.datetime_as_string(reading['timestamp'], unit='ms', timezone='UTC').tolist())
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO sensor_data (batch_id, temperature, ph, humidity, storage_time,"
+                " bacterial_risk, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        self._conn.close()
+
+
+def open_sink(spec):
+    """
+    Sink from a 'csv:<path>' or 'sqlite:<path>' spec.
+    """
+    kind, _, path = spec.partition(':')
+    if kind == 'csv':
+        return CsvSink(path)
+    if kind == 'sqlite':
+        return SQLiteSink(path)
+    raise ValueError(f"Unknown sink {spec!r}; use csv:<path> or sqlite:<path>")
+
+
+async def _produce(simulator, queue, rate, max_readings, duration):
+    start = time.perf_counter()
+    emitted = 0
+    while ((max_readings is None or emitted < max_readings)
+           and (duration is None or time.perf_counter() - start < duration)):
+        reading = simulator.tick()
+        await queue.put(reading)
+        emitted += simulator.num_batches
+        if rate:
+            # Pace to the target rate: sleep until this tick's slot comes up
+            delay = emitted / rate - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(0)
+    await queue.put(None)
+    return emitted
+
+
+async def _consume(queue, sinks):
+    while True:
+        reading = await queue.get()
+        instrumentation.gauge('sensor_queue_depth', queue.qsize())
+        if reading is None:
+            return
+        # Sink I/O runs in a thread so the producer keeps ticking meanwhile
+        await asyncio.gather(*(asyncio.to_thread(sink.write, reading) for sink in sinks))
+
+
+async def run_simulation(simulator, sinks, rate=None, max_readings=None, duration=None,
+                         queue_size=8):
+    """
+    Streams ticks from simulator into every sink until max_readings
+    readings or duration seconds. rate caps readings/sec (None runs
+    flat out); the bounded queue applies backpressure when sinks lag.
+    Returns (readings emitted, elapsed seconds).
+    """
+    queue = asyncio.Queue(maxsize=queue_size)
+    start = time.perf_counter()
+    emitted, _ = await asyncio.gather(
+        _produce(simulator, queue, rate, max_readings, duration),
+        _consume(queue, sinks))
+    return emitted, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate sensor_data readings for load tests.")
+    parser.add_argument('--batches', type=int, default=10_000, help="concurrent batches")
+    parser.add_argument('--rate', type=float, default=None, help="target readings/sec")
+    parser.add_argument('--readings', type=int, default=1_000_000, help="total readings")
+    parser.add_argument('--duration', type=float, default=None, help="stop after N seconds")
+    parser.add_argument('--tick-seconds', type=float, default=60,
+                        help="simulated seconds per tick")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--sink', action='append', default=[],
+                        help="csv:<path> or sqlite:<path>; repeatable")
+    args = parser.parse_args(argv)
+
+    simulator = SensorSimulator(args.batches, args.tick_seconds, rng=args.seed)
+    sinks = [open_sink(spec) for spec in args.sink or [f"csv:{os.devnull}"]]
+    try:
+        emitted, elapsed = asyncio.run(run_simulation(
+            simulator, sinks, rate=args.rate, max_readings=args.readings,
+            duration=args.duration))
+    finally:
+        for sink in sinks:
+            sink.close()
+    print(f"Emitted {emitted:,} readings in {elapsed:.2f}s ({emitted / elapsed:,.0f} readings/s)")
+
+
+if __name__ == "__main__":
+    main()
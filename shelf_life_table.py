@@ -0,0 +1,250 @@
+"""
+Precomputed shelf-life lookup table for low-power gateways.
+
+generate_dataset.shelf_life_hours is smooth in temperature and piecewise
+constant in pH and bacterial load, so it tabulates well: build_table()
+evaluates it once on a dense grid over milk type, log10 CFU, pH and
+temperature (0-25°C) and saves the grid as a plain .npy file that
+open_table() memory-maps. Scoring a reading is then a bin lookup on the
+step axes, linear interpolation on the smooth ones and a few multiplies.
+
+The step axes carry the exact breakpoints of the model, so interpolation
+never straddles a discontinuity and the only error comes from the
+temperature spacing. For linear interpolation with spacing h it is at most
+h^2/8 * max|f''|, and f'' = (ln Q10 / 10)^2 * f peaks at 0°C, which gives
+about 0.0045h for the default 0.1°C grid (see error_bound()). Storing the
+grid as float32 adds at most ~3e-5h. Temperatures outside the grid are
+clamped to its ends.
+
+The table pays off one reading at a time: predict_one() takes ~7us where
+shelf_life_hours on a scalar takes ~20us. On whole arrays NumPy evaluates
+the exact formula faster than any gather-based lookup (1M readings: 0.022s
+exact, 0.030s predict()), so batch scoring should call shelf_life_hours.
+"""
+
+import bisect
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+import generate_dataset as gd
+import instrumentation
+
+GRID_FILE = 'grid.npy'
+AXES_FILE = '_axes.json'
+
+TEMPERATURE_RANGE_C = (0.0, 25.0)
+DEFAULT_TEMPERATURE_STEP_C = 0.1
+
+# Breakpoints of shelf_life_hours. A step axis maps x to bin
+# searchsorted(edges, x, side): bacteria > 10^4 and > 5*10^4 CFU lower
+# shelf life, as does pH < 6.6.
+BACTERIA_LOG_EDGES = [np.log10(10_000), np.log10(50_000)]
+PH_EDGES = [6.6]
+
+
+def _axes(temperature_step):
+    lo, hi = TEMPERATURE_RANGE_C
+    steps = int(round((hi - lo) / temperature_step))
+    return [
+        {'name': 'milk_type', 'kind': 'index', 'size': len(gd.MILK_TYPES)},
+        {'name': 'log_bacteria', 'kind': 'step', 'edges': BACTERIA_LOG_EDGES, 'side': 'left'},
+        {'name': 'ph', 'kind': 'step', 'edges': PH_EDGES, 'side': 'right'},
+        {'name': 'temperature', 'kind': 'linear', 'start': lo, 'step': (hi - lo) / steps,
+         'size': steps + 1},
+    ]
+
+
+def _axis_points(axis):
+    """
+    One representative input value per grid node along an axis.
+    """
+    if axis['kind'] == 'index':
+        return np.arange(axis['size'])
+    if axis['kind'] == 'linear':
+        return axis['start'] + axis['step'] * np.arange(axis['size'])
+    # Any value inside each bin represents it; use the edges themselves,
+    # shifted into the bin they belong to.
+    edges = np.asarray(axis['edges'], dtype=np.float64)
+    below = edges[0] - 1.0
+    if axis['side'] == 'left':   # x == edge falls in the lower bin
+        return np.concatenate([[below], np.nextafter(edges, np.inf)])
+    return np.concatenate([[below], edges])
+
+
+def build_table(path, temperature_step=DEFAULT_TEMPERATURE_STEP_C):
+    """
+    Tabulates shelf_life_hours into the directory `path` (grid + axes).
+    Returns the opened ShelfLifeTable.
+    """
+    axes = _axes(temperature_step)
+    points = np.meshgrid(*[_axis_points(a) for a in axes], indexing='ij', sparse=True)
+    inputs = dict(zip([a['name'] for a in axes], points))
+    # Milk type does not enter the generator's formula; it has its own axis
+    # so per-type models can share the table layout.
+    hours = gd.shelf_life_hours(inputs['temperature'], inputs['ph'], 10 ** inputs['log_bacteria'])
+    grid = np.broadcast_to(hours, [len(_axis_points(a)) for a in axes])
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, GRID_FILE), np.ascontiguousarray(grid, dtype=np.float32))
+    with open(os.path.join(path, AXES_FILE), 'w') as f:
+        json.dump(axes, f, indent=2)
+    return open_table(path)
+
+
+def open_table(path, mmap=True):
+    """
+    Opens a table written by build_table, memory-mapped by default.
+    """
+    with open(os.path.join(path, AXES_FILE)) as f:
+        axes = json.load(f)
+    grid = np.load(os.path.join(path, GRID_FILE), mmap_mode='r' if mmap else None)
+    return ShelfLifeTable(grid, axes)
+
+
+def _blend(grid, offset, blended):
+    # Multilinear interpolation as nested lerps, one per blended axis
+    if not blended:
+        return grid[offset]
+    (stride, weight), rest = blended[0], blended[1:]
+    lower = _blend(grid, offset, rest)
+    return lower + weight * (_blend(grid, offset + stride, rest) - lower)
+
+
+class ShelfLifeTable:
+    """
+    Multilinear interpolation over a tabulated shelf-life grid.
+
+    'index' and 'step' axes select a single node; 'linear' axes blend the
+    two neighbouring nodes, so a lookup touches 2^(linear axes) cells.
+    """
+
+    def __init__(self, grid, axes):
+        self.grid = grid
+        self.axes = axes
+
+    def _locate(self, axis, x, stride):
+        # (lower node * stride, weight of the next node or None) along one
+        # axis, scaled so nodes of all axes sum to a flat grid offset
+        if axis['kind'] == 'index':
+            return np.multiply(x, stride, dtype=np.intp), None
+        if axis['kind'] == 'step':
+            # Bin = number of edges below x (at or below for side='right');
+            # a comparison per edge beats searchsorted for a handful of edges
+            below = np.greater if axis['side'] == 'left' else np.greater_equal
+            offset = 0
+            for edge in axis['edges']:
+                offset = offset + below(x, edge) * stride
+            return offset, None
+        # In-place passes; np.clip is several times slower than max + min
+        pos = np.array(x, dtype=np.float64)
+        pos *= 1 / axis['step']
+        pos -= axis['start'] / axis['step']
+        np.maximum(pos, 0, out=pos)
+        np.minimum(pos, axis['size'] - 1, out=pos)
+        lower = pos.astype(np.intp)
+        np.minimum(lower, axis['size'] - 2, out=lower)
+        pos -= lower
+        if stride != 1:
+            lower *= stride
+        return lower, pos
+
+    @instrumentation.timed('ShelfLifeTable.predict', rows=np.size)
+    def predict(self, temperature, ph, bacteria_count, milk_type=0):
+        """
+        Interpolated shelf_life_hours for arrays (or scalars) of readings.
+        """
+        inputs = {
+            'milk_type': milk_type,
+            'log_bacteria': np.log10(np.maximum(np.asarray(bacteria_count, dtype=np.float64), 1)),
+            'ph': ph,
+            'temperature': temperature,
+        }
+        # Gather from the flattened grid: every axis adds node * stride to
+        # one offset array, and each linear axis blends two offsets. The
+        # plain ndarray view skips memmap's per-indexing overhead.
+        grid = np.asarray(self.grid).reshape(-1)
+        offset = 0
+        blended = []
+        for axis, stride in zip(self.axes, self.grid.strides):
+            stride //= self.grid.itemsize
+            node, weight = self._locate(axis, inputs[axis['name']], stride)
+            offset = offset + node
+            if weight is not None:
+                blended.append((stride, weight))
+        return np.asarray(_blend(grid, offset, blended), dtype=np.float64)
+
+    def predict_one(self, temperature, ph, bacteria_count, milk_type=0):
+        """
+        Scalar predict() without NumPy overhead, for scoring one reading
+        at a time on a gateway. Assumes a single linear axis, as in tables
+        from build_table().
+        """
+        values = {'milk_type': milk_type, 'ph': ph, 'temperature': temperature,
+                  'log_bacteria': math.log10(max(bacteria_count, 1))}
+        index = []
+        blend = None
+        for k, axis in enumerate(self.axes):
+            x = values[axis['name']]
+            if axis['kind'] == 'index':
+                index.append(int(x))
+            elif axis['kind'] == 'step':
+                search = bisect.bisect_left if axis['side'] == 'left' else bisect.bisect_right
+                index.append(search(axis['edges'], x))
+            else:
+                pos = min(max((x - axis['start']) / axis['step'], 0), axis['size'] - 1)
+                lower = min(int(pos), axis['size'] - 2)
+                index.append(lower)
+                blend = (k, pos - lower)
+        if blend is None:
+            return self.grid.item(*index)
+        k, w = blend
+        low = self.grid.item(*index)
+        index[k] += 1
+        return low + w * (self.grid.item(*index) - low)
+
+    def error_bound(self):
+        """
+        Worst-case absolute interpolation error (hours) against the exact
+        formula: h^2/8 * max|f''| along the temperature axis, plus float32
+        rounding of the stored values.
+        """
+        axis = next(a for a in self.axes if a['name'] == 'temperature')
+        k = np.log(gd.Q10) / 10
+        max_hours = float(np.max(self.grid))  # at 0°C, where f'' = k^2 f peaks too
+        interpolation = axis['step'] ** 2 / 8 * k ** 2 * max_hours
+        return interpolation + max_hours * np.finfo(np.float32).eps
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as workdir:
+        table = build_table(workdir)
+        print(f"Grid {table.grid.shape} ({table.grid.nbytes / 1024:.0f} KiB), "
+              f"error bound {table.error_bound():.4f}h")
+
+        n = 1_000_000
+        rng = np.random.default_rng(0)
+        temperature = rng.uniform(*TEMPERATURE_RANGE_C, n)
+        ph = rng.normal(6.7, 0.1, n)
+        bacteria = np.floor(10 ** rng.normal(3.5, 0.8, n))
+        milk_type = rng.integers(0, len(gd.MILK_TYPES), n)
+
+        start = time.perf_counter()
+        exact = gd.shelf_life_hours(temperature, ph, bacteria)
+        exact_s = time.perf_counter() - start
+        start = time.perf_counter()
+        approx = table.predict(temperature, ph, bacteria, milk_type)
+        table_s = time.perf_counter() - start
+        print(f"{n:,} readings: exact {exact_s:.3f}s, table {table_s:.3f}s, "
+              f"max error {np.max(np.abs(approx - exact)):.4f}h")
+
+        start = time.perf_counter()
+        for i in range(10_000):
+            table.predict_one(float(temperature[i]), float(ph[i]), float(bacteria[i]),
+                              int(milk_type[i]))
+        print(f"Single reading: {(time.perf_counter() - start) / 10_000 * 1e6:.1f}us per lookup")
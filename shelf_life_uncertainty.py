@@ -0,0 +1,178 @@
+"""
+Monte Carlo shelf-life intervals.
+
+The edge function reports its prediction +/- 12h as the confidence band.
+Here each batch's readings are perturbed by the sensors' measurement noise,
+scored with the shelf-life model and multiplied by generate_dataset's
+biological variability (BIOLOGICAL_NOISE_CV), num_draws times per batch.
+The empirical quantiles of those draws are the interval. Draws are
+generated as (batches, draws) blocks sized to a memory budget and can be
+split across a process pool; results are reproducible for a given seed,
+worker count and budget.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+import generate_dataset as gd
+import instrumentation
+import sensitivity
+
+# One standard deviation of measurement error per input; bacteria counts
+# are plate counts, whose error is multiplicative (log10 CFU)
+SENSOR_NOISE = {
+    'temperature': 0.3,     # °C
+    'ph': 0.02,
+    'bacteria_count': 0.15,  # log10 CFU
+    'humidity': 2.0,        # %
+    'fat_content': 0.05,    # %
+}
+
+DEFAULT_DRAWS = 1000
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+# Bytes of temporaries per draw while scoring a block (noise, model, sort),
+# measured with tracemalloc on the edge model
+BYTES_PER_DRAW = 112
+DEFAULT_MEMORY_BUDGET = 128 << 20
+
+
+def _perturb(inputs, noise, shape, rng):
+    perturbed = {}
+    for name, values in inputs.items():
+        sd = noise.get(name, 0)
+        column = values[:, np.newaxis]
+        if not sd:
+            perturbed[name] = column
+        elif name == 'bacteria_count':
+            perturbed[name] = column * 10 ** rng.normal(0, sd, shape)
+        else:
+            perturbed[name] = column + rng.normal(0, sd, shape)
+    return perturbed
+
+
+def _simulate_share(inputs, num_draws, quantiles, model, noise, biological_cv, rng,
+                    memory_budget):
+    rng = np.random.default_rng(rng)
+    model = sensitivity.MODELS[model] if isinstance(model, str) else model
+    num_batches = len(inputs['temperature'])
+    values = np.empty((num_batches, len(quantiles)))
+    mean = np.empty(num_batches)
+    std = np.empty(num_batches)
+    block = max(1, memory_budget // (BYTES_PER_DRAW * num_draws))
+    for b0 in range(0, num_batches, block):
+        b1 = min(b0 + block, num_batches)
+        shape = (b1 - b0, num_draws)
+        draws = np.broadcast_to(
+            model(**_perturb({n: v[b0:b1] for n, v in inputs.items()}, noise, shape, rng)),
+            shape)
+        draws = np.maximum(0, draws * (1 + rng.normal(0, biological_cv, shape)))
+        values[b0:b1] = np.quantile(draws, quantiles, axis=1).T
+        mean[b0:b1] = draws.mean(axis=1)
+        std[b0:b1] = draws.std(axis=1)
+    return values, mean, std
+
+
+def _simulate_task(args):
+    return _simulate_share(*args)
+
+
+@instrumentation.timed(rows=lambda result: len(result['mean']) * result['draws'])
+def shelf_life_intervals(batches, num_draws=DEFAULT_DRAWS, quantiles=DEFAULT_QUANTILES,
+                         model='edge', noise=None, biological_cv=gd.BIOLOGICAL_NOISE_CV,
+                         seed=None, workers=1, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Empirical shelf-life quantiles for every batch.
+
+    batches has the sensitivity.BATCH_INPUTS columns (see
+    sensitivity.load_batches); model is a sensitivity.MODELS name, by
+    default the edge-function model. noise overrides SENSOR_NOISE entries.
+    Returns a dict with 'quantiles', 'values' (batches x quantiles),
+    per-batch 'mean', 'std' and noise-free 'point' prediction, plus
+    'confidence_lower'/'confidence_upper' rounded like the edge function
+    from the outer quantiles.
+    """
+    start = time.perf_counter()
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    noise = {**SENSOR_NOISE, **(noise or {})}
+    inputs = {name: np.asarray(batches[name], dtype=np.float64)
+              for name in sensitivity.BATCH_INPUTS}
+    num_batches = len(inputs['temperature'])
+
+    workers = max(1, min(workers or 1, num_batches))
+    seeds = gd.spawn_worker_seeds(seed, workers)
+    bounds = np.cumsum([0] + gd.split_samples(num_batches, workers))
+    tasks = [({n: v[lo:hi] for n, v in inputs.items()}, num_draws, quantiles, model, noise,
+              biological_cv, seed_seq, memory_budget // workers)
+             for lo, hi, seed_seq in zip(bounds[:-1], bounds[1:], seeds)]
+    if workers == 1:
+        parts = [_simulate_task(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_simulate_task, tasks))
+
+    values = np.concatenate([p[0] for p in parts])
+    return {
+        'quantiles': quantiles,
+        'values': values,
+        'mean': np.concatenate([p[1] for p in parts]),
+        'std': np.concatenate([p[2] for p in parts]),
+        'point': sensitivity.evaluate(inputs, model).copy(),
+        'confidence_lower': np.floor(values[:, 0] + 0.5).astype(np.int32),
+        'confidence_upper': np.floor(values[:, -1] + 0.5).astype(np.int32),
+        'draws': num_draws,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo shelf-life intervals.")
+    parser.add_argument('--dataset', default='milk_shelf_life_dataset.csv',
+                        help="batches to score (any generate_dataset format)")
+    parser.add_argument('--limit', type=int, help="use only the first N batches")
+    parser.add_argument('--synthetic', type=int,
+                        help="score N freshly generated batches instead of --dataset")
+    parser.add_argument('-n', '--draws', type=int, default=DEFAULT_DRAWS)
+    parser.add_argument('-q', '--quantile', type=float, action='append',
+                        help=f"repeatable (default {', '.join(map(str, DEFAULT_QUANTILES))})")
+    parser.add_argument('--model', choices=sorted(sensitivity.MODELS), default='edge')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="worker processes (default 1; 0 = one per CPU)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="write per-batch quantiles to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        import shelf_life_model as slm
+
+        columns = gd.generate_milk_columns(args.synthetic, rng=args.seed)
+        batches = {arg: columns[col].astype(np.float64)
+                   for arg, col in slm.DATASET_INPUTS.items()}
+    else:
+        batches = sensitivity.load_batches(args.dataset, limit=args.limit)
+    result = shelf_life_intervals(batches, args.draws, sorted(args.quantile or DEFAULT_QUANTILES),
+                                  args.model, seed=args.seed,
+                                  workers=args.workers or os.cpu_count())
+    num_batches = len(result['mean'])
+    print(f"{num_batches:,} batches x {args.draws:,} draws in {result['seconds']:.2f}s")
+    width = result['values'][:, -1] - result['values'][:, 0]
+    print(f"Interval width: median {np.median(width):.1f}h, "
+          f"p95 {np.quantile(width, 0.95):.1f}h (edge function: fixed 24h)")
+    if args.output:
+        import pandas as pd
+
+        frame = pd.DataFrame(result['values'],
+                             columns=[f"q{q:g}" for q in result['quantiles']])
+        frame.insert(0, 'point', result['point'])
+        frame['mean'] = result['mean']
+        frame['std'] = result['std']
+        frame.to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,568 @@
+"""
+Statistical process control charts computed from actual readings.
+
+Replaces the mocked series in
+source/milk-shelf-life-app/supabase/functions/qc_charts_generator with
+X-bar/R, p-chart, histogram, scatter and Pareto data derived from either
+the sensor_data table (sensor_schema.sql) or the shelf-life dataset CSV.
+Everything works on whole NumPy arrays.
+"""
+
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+import generate_dataset as gd
+import instrumentation
+import shelf_life_model as slm
+
+# Control chart constants by subgroup size n: (A2, D3, D4, d2)
+CONTROL_CHART_CONSTANTS = {
+    2: (1.880, 0.000, 3.267, 1.128),
+    3: (1.023, 0.000, 2.574, 1.693),
+    4: (0.729, 0.000, 2.282, 2.059),
+    5: (0.577, 0.000, 2.114, 2.326),
+    6: (0.483, 0.000, 2.004, 2.534),
+    7: (0.419, 0.076, 1.924, 2.704),
+    8: (0.373, 0.136, 1.864, 2.847),
+    9: (0.337, 0.184, 1.816, 2.970),
+    10: (0.308, 0.223, 1.777, 3.078),
+    11: (0.285, 0.256, 1.744, 3.173),
+    12: (0.266, 0.283, 1.717, 3.258),
+    13: (0.249, 0.307, 1.693, 3.336),
+    14: (0.235, 0.328, 1.672, 3.407),
+    15: (0.223, 0.347, 1.653, 3.472),
+    16: (0.212, 0.363, 1.637, 3.532),
+    17: (0.203, 0.378, 1.622, 3.588),
+    18: (0.194, 0.391, 1.608, 3.640),
+    19: (0.187, 0.403, 1.597, 3.689),
+    20: (0.180, 0.415, 1.585, 3.735),
+    21: (0.173, 0.425, 1.575, 3.778),
+    22: (0.167, 0.434, 1.566, 3.819),
+    23: (0.162, 0.443, 1.557, 3.858),
+    24: (0.157, 0.451, 1.548, 3.895),
+    25: (0.153, 0.459, 1.541, 3.931),
+}
+
+# Columns of public.sensor_data and the dataset CSV column for each reading
+SENSOR_DATA_COLUMNS = ['batch_id', 'temperature', 'ph', 'humidity', 'storage_time',
+                       'bacterial_risk', 'timestamp']
+DATASET_READINGS = {
+    'temperature': 'Temperature_C',
+    'ph': 'pH',
+    'humidity': 'Humidity_Percent',
+    'fat_content': 'Fat_Content_Percent',
+    'bacteria_count': 'Initial_Bacteria_CFU',
+    'shelf_life_hours': 'Shelf_Life_Hours',
+}
+
+
+def load_readings(path, fmt=None):
+    """
+    Loads readings keyed by sensor_data column names.
+
+    A sensor_data export (CSV with the table's columns) is used as is and
+    gains a 'defective' flag for readings the edge function raises a risk
+    factor on; a shelf-life dataset in any generate_dataset format is mapped
+    through DATASET_READINGS and flags Quality_Label == 'Low' instead.
+    """
+    import pandas as pd
+
+    fmt = fmt or gd.infer_format(path)
+    if fmt == 'csv':
+        header = pd.read_csv(path, nrows=0).columns
+        if 'batch_id' in header:
+            df = pd.read_csv(path, parse_dates=['timestamp'] if 'timestamp' in header else None)
+            readings = {c: df[c].to_numpy() for c in df.columns}
+            readings.setdefault('defective', _risk_mask(readings) != 0)
+            return readings
+    df = gd.load_dataset(path, fmt=fmt)
+    readings = {name: df[col].to_numpy() for name, col in DATASET_READINGS.items()}
+    readings['defective'] = (df['Quality_Label'] == 'Low').to_numpy()
+    return readings
+
+
+def subgroups(values, subgroup_size):
+    """
+    Consecutive readings as a (k, subgroup_size) view; a trailing partial
+    subgroup is dropped.
+    """
+    values = np.asarray(values)
+    k = len(values) // subgroup_size
+    return values[:k * subgroup_size].reshape(k, subgroup_size)
+
+
+def _subgroup_mean_range(groups):
+    # Reduce column by column: axis=1 reductions over a tiny inner axis are
+    # several times slower than elementwise passes over the columns.
+    total = groups[:, 0].astype(np.float64)
+    high = groups[:, 0].copy()
+    low = groups[:, 0].copy()
+    for j in range(1, groups.shape[1]):
+        column = groups[:, j]
+        total += column
+        np.maximum(high, column, out=high)
+        np.minimum(low, column, out=low)
+    return total / groups.shape[1], (high - low).astype(np.float64)
+
+
+@instrumentation.timed(rows=lambda chart: len(chart['means']) * chart['subgroup_size'])
+def xbar_r_chart(values, subgroup_size=5):
+    """
+    X-bar and R chart statistics for consecutive subgroups of readings.
+
+    Limits use the A2/D3/D4 constants for the subgroup size; sigma is
+    estimated as R-bar / d2.
+    """
+    if subgroup_size not in CONTROL_CHART_CONSTANTS:
+        raise ValueError(f"subgroup_size must be between 2 and 25, got {subgroup_size}")
+    a2, d3, d4, d2 = CONTROL_CHART_CONSTANTS[subgroup_size]
+
+    groups = subgroups(values, subgroup_size)
+    if len(groups) == 0:
+        raise ValueError("Not enough readings for a single subgroup")
+    means, ranges = _subgroup_mean_range(groups)
+    center = means.mean()
+    r_bar = ranges.mean()
+
+    ucl = center + a2 * r_bar
+    lcl = center - a2 * r_bar
+    r_ucl = d4 * r_bar
+    r_lcl = d3 * r_bar
+    out_of_control = (means > ucl) | (means < lcl) | (ranges > r_ucl) | (ranges < r_lcl)
+
+    return {
+        'subgroup_size': subgroup_size,
+        'means': means,
+        'ranges': ranges,
+        'center': center,
+        'ucl': ucl,
+        'lcl': lcl,
+        'r_center': r_bar,
+        'r_ucl': r_ucl,
+        'r_lcl': r_lcl,
+        'sigma': r_bar / d2,
+        'out_of_control': np.flatnonzero(out_of_control),
+    }
+
+
+def p_chart(defectives, sample_sizes):
+    """
+    p-chart for defective counts per sample; limits vary with sample size.
+    """
+    defectives = np.asarray(defectives, dtype=np.float64)
+    sample_sizes = np.asarray(sample_sizes, dtype=np.float64)
+    proportions = defectives / sample_sizes
+    p_bar = defectives.sum() / sample_sizes.sum()
+    sigma = np.sqrt(p_bar * (1 - p_bar) / sample_sizes)
+    ucl = np.minimum(1, p_bar + 3 * sigma)
+    lcl = np.maximum(0, p_bar - 3 * sigma)
+    return {
+        'proportions': proportions,
+        'center': p_bar,
+        'ucl': ucl,
+        'lcl': lcl,
+        'out_of_control': np.flatnonzero((proportions > ucl) | (proportions < lcl)),
+    }
+
+
+def p_chart_from_flags(defective, sample_size=100):
+    """
+    p-chart over consecutive samples of sample_size boolean defect flags.
+    """
+    flags = subgroups(np.asarray(defective, dtype=bool), sample_size)
+    return p_chart(flags.sum(axis=1), np.full(len(flags), sample_size))
+
+
+def histogram(values, bins=10, value_range=None):
+    """
+    Bin counts with 'lo-hi' labels, as the histogram chart expects.
+    """
+    values = np.asarray(values)
+    counts, edges = np.histogram(values, bins=bins, range=value_range)
+    labels = [f"{lo:.2f}-{hi:.2f}" for lo, hi in zip(edges[:-1], edges[1:])]
+    return {'counts': counts, 'edges': edges, 'labels': labels}
+
+
+def scatter(x, y, max_points=500, rng=0):
+    """
+    Pearson correlation and least-squares fit of y on x over all points,
+    plus a uniform sample of at most max_points pairs for plotting.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    slope, intercept = np.polyfit(x, y, 1)
+    idx = np.arange(len(x))
+    if len(x) > max_points:
+        idx = np.sort(np.random.default_rng(rng).choice(len(x), max_points, replace=False))
+    return {
+        'x': x[idx],
+        'y': y[idx],
+        'correlation': float(np.corrcoef(x, y)[0, 1]),
+        'slope': float(slope),
+        'intercept': float(intercept),
+    }
+
+
+def pareto(labels, counts=None):
+    """
+    Categories sorted by count with cumulative percentages.
+
+    Pass raw labels (one per defect) or unique labels with their counts;
+    for integer-coded labels np.bincount is much cheaper than raw labels.
+    """
+    if counts is None:
+        labels, counts = np.unique(np.asarray(labels), return_counts=True)
+    labels = np.asarray(labels)
+    counts = np.asarray(counts)
+    order = np.argsort(-counts, kind='stable')
+    counts = counts[order]
+    total = counts.sum()
+    cumulative = np.cumsum(counts) / total * 100 if total else np.zeros(len(counts))
+    return {'labels': labels[order], 'counts': counts, 'cumulative': cumulative}
+
+
+def _risk_mask(readings):
+    scored = slm.predict_shelf_life(
+        readings['temperature'], readings['ph'],
+        readings.get('bacteria_count', 0), readings['humidity'],
+        readings.get('fat_content', 0), base_hours=slm.BASE_HOURS)
+    return scored['risk_mask']
+
+
+def risk_factor_pareto(readings):
+    """
+    Pareto of the edge-function risk factors raised across readings.
+    """
+    mask = _risk_mask(readings)
+    bits = list(slm.RISK_FACTORS)
+    counts = np.array([np.count_nonzero(mask & bit) for bit in bits])
+    return pareto([slm.RISK_FACTORS[bit] for bit in bits], counts)
+
+
+def chart_payload(chart_type, readings, parameter='ph', subgroup_size=5, sample_size=100,
+                  bins=10, max_points=50):
+    """
+    Builds the {'data': [...], 'parameters': {...}} body the QC Charts page
+    reads from qc_charts_generator, for the last max_points samples.
+    """
+    if chart_type in ('xbar_control', 'xbar-r'):
+        chart = xbar_r_chart(readings[parameter], subgroup_size)
+        start = max(0, len(chart['means']) - max_points)
+        data = [{'sample': i + 1, 'value': round(float(chart['means'][i]), 3),
+                 'range': round(float(chart['ranges'][i]), 3),
+                 'ucl': chart['ucl'], 'lcl': chart['lcl'], 'mean': chart['center']}
+                for i in range(start, len(chart['means']))]
+        parameters = {k: float(chart[k]) for k in
+                      ('center', 'ucl', 'lcl', 'r_center', 'r_ucl', 'r_lcl', 'sigma')}
+        parameters['mean'] = parameters['center']
+    elif chart_type in ('p_chart', 'p-chart'):
+        chart = p_chart_from_flags(readings['defective'], sample_size)
+        start = max(0, len(chart['proportions']) - max_points)
+        data = [{'sample': i + 1, 'proportion': round(float(chart['proportions'][i]), 4),
+                 'ucl': float(chart['ucl'][i]), 'lcl': float(chart['lcl'][i]),
+                 'centerLine': float(chart['center'])}
+                for i in range(start, len(chart['proportions']))]
+        parameters = {'center': float(chart['center']), 'sampleSize': sample_size}
+    elif chart_type == 'histogram':
+        chart = histogram(readings[parameter], bins)
+        data = [{'range': label, 'count': int(count)}
+                for label, count in zip(chart['labels'], chart['counts'])]
+        parameters = {'bins': bins}
+    elif chart_type == 'scatter':
+        chart = scatter(readings['temperature'], readings[parameter], max_points)
+        data = [{'x': round(float(x), 3), 'y': round(float(y), 3)}
+                for x, y in zip(chart['x'], chart['y'])]
+        parameters = {k: chart[k] for k in ('correlation', 'slope', 'intercept')}
+    elif chart_type == 'pareto':
+        chart = risk_factor_pareto(readings)
+        data = [{'defect': str(label), 'count': int(count), 'cumulative': round(float(cum), 1)}
+                for label, count, cum in zip(chart['labels'], chart['counts'],
+                                             chart['cumulative'])]
+        parameters = {'total': int(chart['counts'].sum())}
+    else:
+        raise ValueError(f"Unknown chart type: {chart_type!r}")
+    return {'data': data, 'parameters': parameters}
+
+
+# --- Streaming control limits -------------------------------------------------
+
+WESTERN_ELECTRIC_RULES = {
+    'rule_1': 'One point beyond 3 sigma',
+    'rule_2': '2 of 3 consecutive points beyond 2 sigma on the same side',
+    'rule_3': '4 of 5 consecutive points beyond 1 sigma on the same side',
+    'rule_4': '8 consecutive points on the same side of the center line',
+}
+
+# Longest run any rule looks at
+_RULE_HISTORY = 8
+
+
+class BatchControlState:
+    """
+    Running statistics and control limits for one batch_id.
+
+    Mean and variance use Welford's update; the sliding window keeps sums
+    for its mean/variance and monotonic deques for its min/max, so every
+    update is O(1) (amortized for the window extremes). Limits are
+    estimated from the first baseline_size readings and then frozen, so a
+    drift shows up as rule violations instead of being absorbed.
+    """
+
+    def __init__(self, window_size=50, baseline_size=25):
+        self.window_size = window_size
+        self.baseline_size = baseline_size
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.last = None
+        self.moving_range_sum = 0.0
+        self.center = None
+        self.sigma = None
+        self.window = deque()
+        self.window_sum = 0.0
+        self.window_sumsq = 0.0
+        self._window_min = deque()  # (seq, value), increasing values
+        self._window_max = deque()  # (seq, value), decreasing values
+        self.zones = deque(maxlen=_RULE_HISTORY)  # signed sigma distance per point
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def window_mean(self):
+        return self.window_sum / len(self.window) if self.window else 0.0
+
+    @property
+    def window_range(self):
+        return self._window_max[0][1] - self._window_min[0][1] if self.window else 0.0
+
+    def set_limits(self, center, sigma):
+        self.center = float(center)
+        self.sigma = float(sigma)
+        self.zones.clear()
+
+    def update(self, value):
+        """
+        Adds one reading; returns the Western Electric rules it violates.
+        """
+        value = float(value)
+        seq = self.count
+
+        # Welford running mean/variance, running range and moving range
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if self.last is not None:
+            self.moving_range_sum += abs(value - self.last)
+        self.last = value
+
+        # Sliding window
+        self.window.append(value)
+        self.window_sum += value
+        self.window_sumsq += value * value
+        while self._window_min and self._window_min[-1][1] >= value:
+            self._window_min.pop()
+        self._window_min.append((seq, value))
+        while self._window_max and self._window_max[-1][1] <= value:
+            self._window_max.pop()
+        self._window_max.append((seq, value))
+        if len(self.window) > self.window_size:
+            old = self.window.popleft()
+            self.window_sum -= old
+            self.window_sumsq -= old * old
+            oldest = seq - self.window_size
+            if self._window_min[0][0] == oldest:
+                self._window_min.popleft()
+            if self._window_max[0][0] == oldest:
+                self._window_max.popleft()
+
+        if self.center is None:
+            if self.count >= self.baseline_size and self.variance > 0:
+                self.set_limits(self.mean, np.sqrt(self.variance))
+            return []
+
+        self.zones.append((value - self.center) / self.sigma)
+        return self._violations()
+
+    def _violations(self):
+        zones = list(self.zones)
+        violated = []
+        if abs(zones[-1]) > 3:
+            violated.append('rule_1')
+        for rule, run, needed, limit in (('rule_2', 3, 2, 2), ('rule_3', 5, 4, 1)):
+            recent = zones[-run:]
+            if len(recent) == run:
+                if (sum(z > limit for z in recent) >= needed
+                        or sum(z < -limit for z in recent) >= needed):
+                    violated.append(rule)
+        if len(zones) == _RULE_HISTORY and (all(z > 0 for z in zones)
+                                             or all(z < 0 for z in zones)):
+            violated.append('rule_4')
+        return violated
+
+    def to_dict(self):
+        return {
+            'window_size': self.window_size,
+            'baseline_size': self.baseline_size,
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min,
+            'max': self.max,
+            'last': self.last,
+            'moving_range_sum': self.moving_range_sum,
+            'center': self.center,
+            'sigma': self.sigma,
+            'window': list(self.window),
+            'window_min': [list(item) for item in self._window_min],
+            'window_max': [list(item) for item in self._window_max],
+            'zones': list(self.zones),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['window_size'], data['baseline_size'])
+        for key in ('count', 'mean', 'm2', 'min', 'max', 'last', 'moving_range_sum',
+                    'center', 'sigma'):
+            setattr(state, key, data[key])
+        state.window = deque(data['window'])
+        state.window_sum = float(sum(state.window))
+        state.window_sumsq = float(sum(v * v for v in state.window))
+        state._window_min = deque(tuple(item) for item in data['window_min'])
+        state._window_max = deque(tuple(item) for item in data['window_max'])
+        state.zones = deque(data['zones'], maxlen=_RULE_HISTORY)
+        return state
+
+
+class StreamingSPC:
+    """
+    Incremental control charting of one parameter (e.g. 'ph') across
+    batches, fed reading by reading from the realtime sensor_data stream.
+
+    snapshot() returns a JSON-serializable dict and restore() rebuilds the
+    tracker from it, so a restarted worker resumes without replaying
+    history.
+    """
+
+    def __init__(self, parameter='ph', window_size=50, baseline_size=25):
+        self.parameter = parameter
+        self.window_size = window_size
+        self.baseline_size = baseline_size
+        self.batches = {}
+
+    def state(self, batch_id):
+        if batch_id not in self.batches:
+            self.batches[batch_id] = BatchControlState(self.window_size, self.baseline_size)
+        return self.batches[batch_id]
+
+    def set_limits(self, batch_id, center, sigma):
+        """
+        Uses known limits (e.g. from xbar_r_chart) instead of a baseline.
+        """
+        self.state(batch_id).set_limits(center, sigma)
+
+    def update(self, batch_id, value):
+        """
+        Adds one reading for batch_id; returns the violated rule ids.
+        """
+        return self.state(batch_id).update(value)
+
+    def update_reading(self, reading):
+        """
+        Adds one sensor_data row (a dict keyed by column name).
+        """
+        return self.update(reading['batch_id'], reading[self.parameter])
+
+    def update_many(self, batch_ids, values):
+        """
+        Adds readings in arrival order; returns (index, batch_id, rules)
+        for every reading that violated at least one rule.
+        """
+        alerts = []
+        with instrumentation.timer('StreamingSPC.update_many', rows=len(values)):
+            for i, (batch_id, value) in enumerate(zip(batch_ids, values)):
+                violated = self.update(batch_id, value)
+                if violated:
+                    alerts.append((i, batch_id, violated))
+        instrumentation.count('spc_violations', len(alerts))
+        return alerts
+
+    def summary(self, batch_id):
+        s = self.batches[batch_id]
+        return {
+            'count': s.count,
+            'mean': s.mean,
+            'std': float(np.sqrt(s.variance)),
+            'range': s.max - s.min,
+            'average_moving_range': s.moving_range_sum / (s.count - 1) if s.count > 1 else 0.0,
+            'window_mean': s.window_mean,
+            'window_range': s.window_range,
+            'center': s.center,
+            'ucl': None if s.center is None else s.center + 3 * s.sigma,
+            'lcl': None if s.center is None else s.center - 3 * s.sigma,
+        }
+
+    def snapshot(self):
+        # [batch_id, state] pairs rather than a dict: JSON object keys are
+        # always strings, and int batch ids must come back as ints
+        return {
+            'parameter': self.parameter,
+            'window_size': self.window_size,
+            'baseline_size': self.baseline_size,
+            'batches': [[k.item() if isinstance(k, np.generic) else k, v.to_dict()]
+                        for k, v in self.batches.items()],
+        }
+
+    @classmethod
+    def restore(cls, snapshot):
+        tracker = cls(snapshot['parameter'], snapshot['window_size'], snapshot['baseline_size'])
+        batches = snapshot['batches']
+        pairs = batches.items() if isinstance(batches, dict) else batches
+        tracker.batches = {k: BatchControlState.from_dict(v) for k, v in pairs}
+        return tracker
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.restore(json.load(f))
+
+
+if __name__ == "__main__":
+    n = 10_000_000
+    columns = gd.generate_milk_columns(n, rng=0)
+    ph = columns['pH']
+    defective = columns['Quality_Label'] == gd.QUALITY_LABELS.index('Low')
+
+    for name, fn in [
+        ('xbar-r', lambda: xbar_r_chart(ph, 5)),
+        ('p-chart', lambda: p_chart_from_flags(defective, 100)),
+        ('histogram', lambda: histogram(ph, 20)),
+        ('pareto', lambda: pareto(gd.MILK_TYPES, np.bincount(columns['Milk_Type'],
+                                                             minlength=len(gd.MILK_TYPES)))),
+    ]:
+        start = time.perf_counter()
+        fn()
+        print(f"{name:<10} over {n:,} readings: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    tracker = StreamingSPC('ph')
+    batch_ids = np.arange(200_000) % 1000
+    start = time.perf_counter()
+    alerts = tracker.update_many(batch_ids.tolist(), ph[:200_000].tolist())
+    elapsed = time.perf_counter() - start
+    print(f"streaming  {len(batch_ids) / elapsed:,.0f} readings/s, {len(alerts)} alerts")
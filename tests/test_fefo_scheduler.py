@@ -0,0 +1,44 @@
+import numpy as np
+
+from fefo_scheduler import FefoScheduler
+
+
+def make_scheduler():
+    return FefoScheduler(clock=lambda: 1_000_000.0)
+
+
+def test_pop_after_update_returns_to_earlier_key():
+    scheduler = make_scheduler()
+    # Enough batches that single updates are pushed rather than re-heapified
+    scheduler.update([f"F{i}" for i in range(100)], [100.0] * 100)
+    scheduler.update(['B0', 'B1'], [10.0, 30.0])
+    scheduler.update(['B0'], [20.0])
+    scheduler.update(['B0'], [10.0])
+
+    shipped = scheduler.pop(3)
+    assert list(shipped['batch_id']) == ['B0', 'B1', 'F0']
+    assert len(scheduler) == 99
+    assert scheduler.stats()['stale_entries'] >= 0
+    assert 'B1' not in scheduler
+
+
+def test_queries_match_sorted_expiries():
+    rng = np.random.default_rng(0)
+    scheduler = make_scheduler()
+    ids = np.array([f"B{i}" for i in range(500)], dtype=object)
+    expected = {}
+    for _ in range(50):
+        idx = rng.integers(0, len(ids), 40)
+        hours = rng.integers(0, 48, len(idx)).astype(float)
+        scheduler.update(ids[idx], hours)
+        for i, h in zip(idx, hours):
+            expected[ids[i]] = int(1_000_000 + h * 3600)
+
+    order = sorted(expected.values())
+    assert list(scheduler.peek(20)['expires_at']) == order[:20]
+    within = scheduler.expiring_within(12)
+    assert sorted(within['batch_id']) == sorted(b for b, e in expected.items()
+                                                if e <= 1_000_000 + 12 * 3600)
+    shipped = scheduler.pop(len(expected) + 10)
+    assert list(shipped['expires_at']) == order
+    assert len(scheduler) == 0
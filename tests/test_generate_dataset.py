@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import generate_dataset as gd
+
+
+def test_parallel_npy_matches_other_formats(tmp_path):
+    kwargs = dict(seed=3, workers=3, chunk_size=400)
+    gd.write_milk_dataset_parallel(str(tmp_path / 'data'), 2001, fmt='npy', **kwargs)
+    gd.write_milk_dataset_parallel(str(tmp_path / 'data.feather'), 2001, **kwargs)
+    npy = gd.load_columns(str(tmp_path / 'data'))
+    feather = gd.load_columns(str(tmp_path / 'data.feather'))
+    for column in gd.COLUMNS:
+        np.testing.assert_array_equal(npy[column], feather[column])
+
+    gd.write_milk_dataset_parallel(str(tmp_path / 'again'), 2001, fmt='npy', **kwargs)
+    again = gd.load_columns(str(tmp_path / 'again'))
+    for column in gd.COLUMNS:
+        np.testing.assert_array_equal(npy[column], again[column])
+
+
+@pytest.mark.parametrize('args', [['-n', '0'], ['--chunk-size', '0'], ['-j', '-1']])
+def test_main_rejects_bad_sizes(tmp_path, args):
+    output = tmp_path / 'empty.csv'
+    with pytest.raises(SystemExit) as exc:
+        gd.main(args + ['-o', str(output)])
+    assert exc.value.code == 2
+    assert not output.exists()
+
+
+def test_column_chunks_reject_empty_chunks():
+    with pytest.raises(ValueError):
+        next(gd.iter_milk_column_chunks(10, chunk_size=0))
+
+
+def test_load_columns_feather(tmp_path):
+    single, multi = str(tmp_path / 'single.feather'), str(tmp_path / 'multi.feather')
+    gd.write_milk_dataset(single, 1000, chunk_size=1000, rng=1)
+    gd.write_milk_dataset(multi, 1000, chunk_size=300, rng=1)
+    expected = gd.generate_milk_columns(1000, rng=1)
+
+    columns = ['pH', 'Milk_Type']
+    views = gd.load_columns(single, columns=columns)
+    assert list(views) == columns
+    assert not views['pH'].flags.owndata  # a view of the memory-mapped file
+    np.testing.assert_array_equal(views['pH'], expected['pH'])
+
+    combined = gd.load_columns(multi)
+    chunks = list(gd.iter_milk_column_chunks(1000, 300, rng=1))
+    for column in gd.COLUMNS:
+        np.testing.assert_array_equal(combined[column],
+                                      np.concatenate([c[column] for c in chunks]))
@@ -0,0 +1,37 @@
+import numpy as np
+
+import prediction_cache as pc
+
+
+def test_empty_batch_on_cold_cache():
+    cache = pc.PredictionCache()
+    scored = cache.score({name: np.zeros(0) for name in pc.INPUTS})
+    assert all(len(values) == 0 for values in scored.values())
+    assert cache.stats()['hits'] + cache.stats()['misses'] == 0
+
+    reading = {name: np.full(2, 4.0) for name in pc.INPUTS}
+    assert set(cache.score(reading)) == set(scored)
+
+
+def test_cache_keeps_readings_on_their_side_of_thresholds():
+    # Each input straddling the edge model's step and risk thresholds
+    around = {
+        'temperature': [4.96, 4.99, 5.0, 5.01, 5.04],
+        'ph': [6.496, 6.499, 6.5, 6.501, 6.504],
+        'bacteria_count': [29_900, 29_999, 30_000, 30_001, 30_100,
+                           49_900, 49_999, 50_000, 50_001, 50_100],
+        'humidity': [79.96, 79.99, 80.0, 80.01, 80.04],
+        'fat_content': [3.496, 3.499, 3.5, 3.501, 3.504],
+    }
+    typical = {'temperature': 4.0, 'ph': 6.7, 'bacteria_count': 1000.0, 'humidity': 65.0,
+               'fat_content': 2.0, 'milk_type': 0}
+    for name, values in around.items():
+        readings = {field: np.full(len(values), value) for field, value in typical.items()}
+        readings[name] = np.array(values, dtype=np.float64)
+        cached = pc.PredictionCache().score(readings)
+        direct = pc.PredictionCache(bypass=True).score(readings)
+        np.testing.assert_array_equal(cached['risk_mask'], direct['risk_mask'], err_msg=name)
+        # Within a bucket of the direct score (20h per °C, 0.1°C buckets),
+        # and closer than the 2h and 5h steps
+        np.testing.assert_allclose(cached['shelf_life_hours'], direct['shelf_life_hours'],
+                                   atol=2 if name == 'temperature' else 1, err_msg=name)
@@ -0,0 +1,39 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import generate_dataset as gd
+import sensitivity
+import shelf_life_model as slm
+
+
+@pytest.mark.parametrize('budget_points', [1, 7, 12, 60, 10_000])
+@pytest.mark.parametrize('model', ['dataset', 'edge'])
+def test_sweep_matches_pointwise_evaluation(model, budget_points):
+    columns = gd.generate_milk_columns(5, rng=0)
+    batches = {arg: columns[col].astype(np.float64) for arg, col in slm.DATASET_INPUTS.items()}
+    sweeps = {'temperature': [2, 4, 6], 'ph': [6.5, 6.7], 'fat_content': [1, 2, 3, 4, 5]}
+    result = sensitivity.sweep(batches, sweeps, model,
+                               memory_budget=budget_points * sensitivity.BYTES_PER_POINT)
+
+    for (i, t), (j, ph), (k, fat) in itertools.product(
+            *(enumerate(values) for values in sweeps.values())):
+        expected = sensitivity.evaluate(batches, model, temperature=t, ph=ph, fat_content=fat)
+        np.testing.assert_allclose(result['grid'][:, i, j, k], expected, rtol=1e-6)
+    np.testing.assert_allclose(result['mean'], result['grid'].mean(axis=0), rtol=1e-6)
+    np.testing.assert_allclose(result['max'], result['grid'].max(axis=0), rtol=1e-6)
+
+
+def test_bacteria_gradient_is_per_log10_cfu():
+    columns = gd.generate_milk_columns(5, rng=0)
+    batches = {arg: columns[col].astype(np.float64) for arg, col in slm.DATASET_INPUTS.items()}
+    # Above 10^4.5 CFU the edge model loses 40h per log10 CFU
+    sweeps = {'bacteria_count': np.logspace(5, 5.5, 6), 'temperature': [2.0]}
+    result = sensitivity.sweep(batches, sweeps, 'edge')
+    np.testing.assert_allclose(result['gradient']['bacteria_count'], -40, rtol=1e-6)
+
+    batches['bacteria_count'] = np.full(5, 10 ** 5.25)
+    batches['temperature'] = np.full(5, 2.0)
+    derivative = sensitivity.partial_derivatives(batches, 'edge', ['bacteria_count'])
+    np.testing.assert_allclose(derivative['bacteria_count'], -40, rtol=1e-6)
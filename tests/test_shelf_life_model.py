@@ -0,0 +1,28 @@
+import itertools
+
+import numpy as np
+
+import shelf_life_model as slm
+
+
+def test_matches_reference_on_random_batches():
+    assert slm.check_parity(num_batches=20_000, rng=0) == 0
+
+
+def test_matches_reference_at_thresholds():
+    # Every penalty and risk threshold, just below, on and just above it
+    grid = np.array(list(itertools.product(
+        [-2, 4, 5, 5.01, 16],
+        [6.49, 6.5, 6.6, 6.8, 6.81],
+        [0, 30000, 31623, 50000, 50001, 1e9],
+        [80, 80.01],
+        [3.5, 3.51],
+    )), dtype=np.float64).T
+    for base_hours in (168, 180.5, 192):
+        scored = slm.predict_shelf_life(*grid, base_hours=base_hours)
+        for i, inputs in enumerate(grid.T):
+            ref = slm.predict_shelf_life_reference(*inputs, base_hours)
+            assert ref['predicted_hours'] == scored['predicted_hours'][i]
+            assert ref['confidence_lower'] == scored['confidence_lower'][i]
+            assert ref['confidence_upper'] == scored['confidence_upper'][i]
+            assert ref['risk_factors'] == slm.risk_factor_names(scored['risk_mask'][i])
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+import generate_dataset as gd
+import shelf_life_table
+
+
+def test_predict_within_error_bound(tmp_path):
+    table = shelf_life_table.build_table(str(tmp_path))
+    rng = np.random.default_rng(0)
+    n = 10_000
+    temperature = rng.uniform(*shelf_life_table.TEMPERATURE_RANGE_C, n)
+    # Include the exact breakpoints of the step axes
+    ph = np.concatenate([rng.normal(6.7, 0.1, n - 2), [6.6, 6.6]])
+    bacteria = np.concatenate([np.floor(10 ** rng.normal(3.5, 0.8, n - 2)), [10_000, 50_000]])
+    milk_type = rng.integers(0, len(gd.MILK_TYPES), n)
+
+    exact = gd.shelf_life_hours(temperature, ph, bacteria)
+    approx = table.predict(temperature, ph, bacteria, milk_type)
+    assert approx.shape == exact.shape
+    assert np.max(np.abs(approx - exact)) <= table.error_bound()
+    for i in range(0, n, 97):
+        assert table.predict_one(temperature[i], ph[i], bacteria[i], int(milk_type[i])) \
+            == pytest.approx(approx[i])
+    assert table.predict(temperature[0], ph[0], bacteria[0]) == pytest.approx(approx[0])
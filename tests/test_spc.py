@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import spc
+
+
+def test_save_restore_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    values = rng.normal(6.7, 0.05, 400).tolist()
+    # int ids as in the demo, plus str ids
+    batch_ids = [i % 4 for i in range(200)] + [f"B{i % 4}" for i in range(200)]
+
+    live = spc.StreamingSPC('ph', window_size=20, baseline_size=10)
+    live.update_many(batch_ids[:300], values[:300])
+    path = str(tmp_path / 'spc.json')
+    live.save(path)
+    restored = spc.StreamingSPC.load(path)
+
+    assert sorted(map(repr, restored.batches)) == sorted(map(repr, live.batches))
+    # Window sums are recomputed on restore, so allow for rounding
+    for batch_id in live.batches:
+        assert restored.summary(batch_id) == pytest.approx(live.summary(batch_id))
+    assert (restored.update_many(batch_ids[300:], values[300:])
+            == live.update_many(batch_ids[300:], values[300:]))
+    for batch_id in live.batches:
+        assert restored.summary(batch_id) == pytest.approx(live.summary(batch_id))
+
+
+def test_p_chart_from_sensor_data_export(tmp_path):
+    path = tmp_path / 'sensor_data.csv'
+    path.write_text(
+        'batch_id,temperature,ph,humidity,storage_time,bacterial_risk,timestamp\n'
+        + ''.join(f'B1,{4 + i % 3},{6.4 + (i % 5) / 10:.1f},60,{i},0.1,2024-01-01T00:00:00Z\n'
+                  for i in range(200)))
+    readings = spc.load_readings(str(path))
+
+    # Flagged like the Pareto: temperature above 5°C or pH below 6.5
+    expected = (readings['temperature'] > 5) | (readings['ph'] < 6.5)
+    np.testing.assert_array_equal(readings['defective'], expected)
+    payload = spc.chart_payload('p_chart', readings, sample_size=50)
+    assert len(payload['data']) == 4
+    assert payload['parameters']['center'] == pytest.approx(expected.mean())
@@ -0,0 +1,193 @@
+"""
+Trains the shelf-life regressor and Quality_Label classifier on
+milk_shelf_life_dataset.csv and caches the fitted models on disk.
+
+Artifacts are keyed by a content hash of the training data and the
+hyperparameters, so repeated runs (and scoring processes) load the cached
+models instead of retraining.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.ensemble import (HistGradientBoostingRegressor, RandomForestClassifier,
+                              RandomForestRegressor, VotingRegressor)
+from sklearn.metrics import accuracy_score, mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+
+import generate_dataset as gd
+import instrumentation
+
+DATASET_PATH = "milk_shelf_life_dataset.csv"
+MODEL_DIR = "models"
+
+FEATURES = [
+    'Temperature_C',
+    'pH',
+    'Initial_Bacteria_CFU',
+    'Fat_Content_Percent',
+    'Humidity_Percent',
+    'Milk_Type',
+]
+TARGET_HOURS = 'Shelf_Life_Hours'
+TARGET_LABEL = 'Quality_Label'
+
+DEFAULT_PARAMS = {
+    'test_size': 0.2,
+    'random_state': 0,
+    'random_forest': {'n_estimators': 200, 'max_depth': 14, 'min_samples_leaf': 2},
+    'gradient_boosting': {'max_iter': 300, 'learning_rate': 0.05, 'max_leaf_nodes': 31},
+    'classifier': {'n_estimators': 200, 'max_depth': 12, 'min_samples_leaf': 2},
+}
+
+
+def feature_matrix(df):
+    """
+    Model inputs as a float32 matrix; Milk_Type enters as its category code.
+    """
+    columns = []
+    for c in FEATURES:
+        if c in gd.CATEGORIES:
+            columns.append(np.asarray(df[c].cat.codes, dtype=np.float32))
+        else:
+            columns.append(np.asarray(df[c], dtype=np.float32))
+    return np.column_stack(columns)
+
+
+def file_digest(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def artifact_key(data_path, params):
+    """
+    Content hash of the training data, hyperparameters and library versions.
+    """
+    h = hashlib.sha256()
+    h.update(file_digest(data_path).encode())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    h.update(f"sklearn={sklearn.__version__};numpy={np.__version__}".encode())
+    return h.hexdigest()[:16]
+
+
+def artifact_path(key, model_dir=MODEL_DIR):
+    return os.path.join(model_dir, f"shelf_life_models_{key}.joblib")
+
+
+def train(df, params=DEFAULT_PARAMS):
+    """
+    Fits the shelf-life ensemble and the quality classifier on a typed
+    dataset frame. Returns the artifact dict (models, params, metrics).
+    """
+    x = feature_matrix(df)
+    hours = np.asarray(df[TARGET_HOURS])
+    labels = np.asarray(df[TARGET_LABEL].cat.codes)
+    x_train, x_test, h_train, h_test, l_train, l_test = train_test_split(
+        x, hours, labels, test_size=params['test_size'], random_state=params['random_state'])
+
+    seed = params['random_state']
+    regressor = VotingRegressor([
+        ('random_forest', RandomForestRegressor(random_state=seed, n_jobs=-1,
+                                                **params['random_forest'])),
+        ('gradient_boosting', HistGradientBoostingRegressor(random_state=seed,
+                                                            **params['gradient_boosting'])),
+    ])
+    classifier = RandomForestClassifier(random_state=seed, n_jobs=-1, **params['classifier'])
+
+    start = time.perf_counter()
+    regressor.fit(x_train, h_train)
+    classifier.fit(x_train, l_train)
+    train_s = time.perf_counter() - start
+
+    # Scoring is latency-bound on small batches; skip the thread pool there
+    regressor.named_estimators_['random_forest'].set_params(n_jobs=1)
+    classifier.set_params(n_jobs=1)
+
+    predicted_hours = regressor.predict(x_test)
+    return {
+        'regressor': regressor,
+        'classifier': classifier,
+        'features': FEATURES,
+        'params': params,
+        'metrics': {
+            'train_seconds': train_s,
+            'train_rows': len(x_train),
+            'test_rows': len(x_test),
+            'hours_mae': float(mean_absolute_error(h_test, predicted_hours)),
+            'hours_r2': float(r2_score(h_test, predicted_hours)),
+            'label_accuracy': float(accuracy_score(l_test, classifier.predict(x_test))),
+        },
+    }
+
+
+def load_or_train(data_path=DATASET_PATH, params=DEFAULT_PARAMS, model_dir=MODEL_DIR):
+    """
+    Returns (artifact, cache_hit). The artifact is loaded from model_dir when
+    one exists for the current data and params, otherwise trained and saved.
+    """
+    key = artifact_key(data_path, params)
+    path = artifact_path(key, model_dir)
+    if os.path.exists(path):
+        return joblib.load(path), True
+
+    artifact = train(gd.load_dataset(data_path), params)
+    artifact['key'] = key
+    artifact['data_path'] = data_path
+    os.makedirs(model_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+    return artifact, False
+
+
+@instrumentation.timed('train_models.predict',
+                       rows=instrumentation.column_rows('shelf_life_hours'))
+def predict(artifact, df):
+    """
+    Predicted Shelf_Life_Hours and Quality_Label for a typed dataset frame.
+    """
+    x = feature_matrix(df)
+    codes = artifact['classifier'].predict(x)
+    return {
+        'shelf_life_hours': artifact['regressor'].predict(x),
+        'quality_label': np.asarray(gd.QUALITY_LABELS, dtype=object)[codes],
+    }
+
+
+def measure_latency(artifact, batch_sizes=(1, 100, 10_000), repeats=5, rng=0):
+    """
+    Median seconds per predict() call for each batch size.
+    """
+    results = {}
+    for n in batch_sizes:
+        batch = gd.generate_milk_dataset(n, rng=rng)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict(artifact, batch)
+            timings.append(time.perf_counter() - start)
+        results[n] = float(np.median(timings))
+    return results
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    artifact, cache_hit = load_or_train()
+    cold_start_s = time.perf_counter() - start
+
+    source = "loaded cached artifact" if cache_hit else "trained new artifact"
+    print(f"{source} {artifact['key']} in {cold_start_s:.2f}s")
+    for name, value in artifact['metrics'].items():
+        print(f"  {name}: {value:.4g}")
+
+    print("\nPer-batch inference latency:")
+    for n, seconds in measure_latency(artifact).items():
+        print(f"  {n:>6} rows: {seconds * 1000:.2f} ms")